@@ -1,3 +1,52 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from quiz.models import GenerateQuiz, QuizNumberCounter, QuizType
+
+from .views import PAGE_SIZE
+
+
+class HomeHistoryTests(TestCase):
+    """Uzun tarix: har bir sahifa bir xil sondagi so'rov bilan, takrorlarsiz ochiladi."""
+
+    HISTORY = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student', password='secret')
+        quiz_types = [QuizType.objects.create(name=name) for name in ('Matematika', 'Fizika')]
+        GenerateQuiz.objects.bulk_create([
+            GenerateQuiz(user=cls.user, quiz_type=quiz_types[i % 2], numbers=number, question_count=10)
+            for i, number in enumerate(QuizNumberCounter.allocate(cls.HISTORY))
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def walk(self, **params):
+        """Kursor bo'yicha barcha sahifalarni ochadi: (ko'rilgan id'lar, har sahifadagi so'rovlar soni)."""
+        seen, counts = [], []
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('home'), params)
+            counts.append(len(ctx.captured_queries))
+            seen.extend(quiz.id for quiz in response.context['my_test'])
+            if not response.context['next_cursor']:
+                return seen, counts
+            params['cursor'] = response.context['next_cursor']
+
+    def test_every_page_costs_the_same(self):
+        seen, counts = self.walk()
+        self.assertEqual(len(seen), self.HISTORY)
+        self.assertEqual(len(set(seen)), self.HISTORY)
+        self.assertEqual(len(counts), -(-self.HISTORY // PAGE_SIZE))
+        self.assertEqual(set(counts), {3})
+
+    def test_quiz_type_filter(self):
+        quiz_type = QuizType.objects.get(name='Fizika')
+        seen, counts = self.walk(quiz_type=quiz_type.id)
+        self.assertEqual(len(set(seen)), self.HISTORY // 2)
+        self.assertEqual(set(counts), {3})
@@ -1,13 +1,62 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
 from django.shortcuts import render, redirect
-from quiz.models import GenerateQuizQuestion, AnswerUsers, GenerateQuiz
+from quiz.models import GenerateQuiz, QuizType
+
+# Bir sahifadagi testlar soni
+PAGE_SIZE = 20
+
+
+def encode_cursor(quiz):
+    """Keyingi sahifa kursori: oxirgi qatorning (created, id) jufti."""
+    raw = f"{quiz.created.isoformat()}|{quiz.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created, quiz_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created), int(quiz_id)
+    except (ValueError, UnicodeError):
+        return None
+
 
 # Create your views here.
 def home(request):
     if request.user.is_authenticated:
-        my_test = GenerateQuiz.objects.filter(user=request.user).order_by('-numbers')
-        context = {'my_test': my_test}
+        # Keyset (kursor) sahifalash: (user, -created, -id) indeksi bo'yicha, OFFSET'siz —
+        # tarix qancha uzun bo'lmasin, har bir sahifa bir xil tez
+        my_test = (
+            GenerateQuiz.objects.filter(user=request.user)
+            .select_related('quiz_type')
+            .order_by('-created', '-id')
+        )
+
+        quiz_type_id = request.GET.get('quiz_type')
+        if quiz_type_id and quiz_type_id.isdigit():
+            my_test = my_test.filter(quiz_type_id=int(quiz_type_id))
+        else:
+            quiz_type_id = None
+
+        cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        if cursor:
+            created, last_id = cursor
+            my_test = my_test.filter(Q(created__lt=created) | Q(created=created, id__lt=last_id))
+
+        page = list(my_test[:PAGE_SIZE + 1])
+        next_cursor = encode_cursor(page[PAGE_SIZE - 1]) if len(page) > PAGE_SIZE else None
+
+        context = {
+            'my_test': page[:PAGE_SIZE],
+            'next_cursor': next_cursor,
+            'is_first_page': cursor is None,
+            'quiz_types': QuizType.objects.filter(is_active=True).order_by('name'),
+            'selected_quiz_type': int(quiz_type_id) if quiz_type_id else None,
+        }
 
 
         return render(request, 'index.html', context)
     else:
-        return redirect('login')
\ No newline at end of file
+        return redirect('login')
@@ -1,20 +1,72 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .dedup import find_near_duplicates, deactivate_duplicates
 from .models import (
     QuizType, Question, Answer,
     GenerateQuiz, GenerateQuizQuestion,
-    AnswerUsers
+    AnswerUsers, ImportJob, QuizNumberCounter, QuestionPoolSnapshot, RequestProfile, batch_correct_count,
 )
 
 
 # --- 1️⃣ Test turi ---
 @admin.register(QuizType)
 class QuizTypeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'is_active')
+    list_display = ('id', 'name', 'is_active', 'near_duplicates_link')
     list_filter = ('is_active',)
     search_fields = ('name',)
     ordering = ('id',)
     list_editable = ('is_active',)
 
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/near-duplicates/',
+                self.admin_site.admin_view(self.near_duplicates_view),
+                name='quiz_quiztype_near_duplicates',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='Dublikatlar')
+    def near_duplicates_link(self, obj):
+        url = reverse('admin:quiz_quiztype_near_duplicates', args=[obj.pk])
+        return format_html('<a href="{}">Hisobot</a>', url)
+
+    def near_duplicates_view(self, request, pk):
+        """Deyarli bir xil savollar hisoboti; POST — tanlangan guruh(lar)ni bir bosishda nofaol qilish."""
+        quiz_type = get_object_or_404(QuizType, pk=pk)
+        if not self.has_change_permission(request, quiz_type):
+            return redirect('admin:index')
+
+        clusters = find_near_duplicates(quiz_type)
+
+        if request.method == 'POST':
+            selected = set(request.POST.getlist('cluster'))
+            if 'all' not in selected:
+                # Guruh birinchi (qoldiriladigan) savol id'si bilan belgilanadi
+                clusters = [c for c in clusters if str(c[0]) in selected]
+            count = deactivate_duplicates(clusters)
+            messages.success(request, f"{count} ta dublikat savol nofaol qilindi.")
+            return redirect('admin:quiz_quiztype_near_duplicates', pk=pk)
+
+        names = dict(
+            Question.objects.filter(id__in=[qid for c in clusters for qid in c]).values_list('id', 'name')
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': quiz_type,
+            'title': f"Deyarli bir xil savollar: {quiz_type}",
+            'clusters': [[(qid, names[qid]) for qid in c] for c in clusters],
+            'duplicates_count': sum(len(c) - 1 for c in clusters),
+        }
+        return TemplateResponse(request, 'admin/quiz/quiztype/near_duplicates.html', context)
+
 
 # --- 2️⃣ Savollar ---
 class AnswerInline(admin.TabularInline):
@@ -33,6 +85,12 @@ class QuestionAdmin(admin.ModelAdmin):
     ordering = ('id',)
     list_editable = ('is_active',)
 
+    def save_related(self, request, form, formsets, change):
+        # Inline javoblar uchun correct_count oxirida bitta UPDATE bilan yangilanadi
+        with batch_correct_count():
+            super().save_related(request, form, formsets, change)
+        form.instance.refresh_content_hash()
+
 
 # --- 3️⃣ Javoblar ---
 @admin.register(Answer)
@@ -43,38 +101,72 @@ class AnswerAdmin(admin.ModelAdmin):
     list_editable = ('is_correct', 'is_active')
     ordering = ('question', 'id')
 
+    def changelist_view(self, request, extra_context=None):
+        # list_editable orqali ko'p qator saqlansa ham correct_count bitta UPDATE bilan yangilanadi
+        with batch_correct_count():
+            return super().changelist_view(request, extra_context)
+
+    def delete_queryset(self, request, queryset):
+        question_ids = set(queryset.values_list('question_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Question.recount_correct(question_ids)
+
 
 # --- 4️⃣ Foydalanuvchi testlari ---
 class GenerateQuizQuestionInline(admin.TabularInline):
     model = GenerateQuizQuestion
     extra = 0
-    fields = ('question',)
+    fields = ('position', 'question')
+    ordering = ('position',)
     show_change_link = True
 
 
 @admin.register(GenerateQuiz)
 class GenerateQuizAdmin(admin.ModelAdmin):
-    list_display = ('id', 'numbers', 'user', 'quiz_type', 'score', 'created', 'finished')
-    list_filter = ('quiz_type', 'created', 'finished')
+    list_display = ('id', 'numbers', 'user', 'quiz_type', 'question_count', 'answered_count', 'correct_count',
+                    'score', 'created', 'finished')
+    list_filter = ('quiz_type', 'created', 'finished', ('user', admin.EmptyFieldListFilter))
     search_fields = ('numbers', 'user__username', 'quiz_type__name')
     ordering = ('-created',)
     inlines = [GenerateQuizQuestionInline]
+    readonly_fields = ('seed', 'pool_version', 'expanded_questions')
+
+    @admin.display(description='Savollar (tartib bilan)')
+    def expanded_questions(self, obj):
+        # Seed rejimidagi testlarda savol qatorlari yo'q — ro'yxat seed'dan tiklanadi
+        if not obj.pk:
+            return '-'
+        question_ids = obj.question_ids()
+        names = dict(Question.objects.filter(id__in=question_ids).values_list('id', 'name'))
+        return format_html_join(
+            '', '<div>{}. {}</div>',
+            ((position, names.get(qid, f'#{qid}')) for position, qid in enumerate(question_ids, 1)),
+        )
 
 
 # --- 5️⃣ Testdagi savollar ---
 @admin.register(GenerateQuizQuestion)
 class GenerateQuizQuestionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'quiz', 'question')
+    list_display = ('id', 'quiz', 'position', 'question')
     list_filter = ('quiz__quiz_type',)
     search_fields = ('quiz__numbers', 'question__name', 'quiz__user__username')
     ordering = ('id',)
 
 
+# --- Savollar to'plami snapshotlari (seed rejimi) ---
+@admin.register(QuestionPoolSnapshot)
+class QuestionPoolSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('id', 'quiz_type', 'version', 'created')
+    list_filter = ('quiz_type',)
+    exclude = ('ids',)
+    ordering = ('-id',)
+
+
 # --- 6️⃣ Foydalanuvchi javoblari ---
 @admin.register(AnswerUsers)
 class AnswerUsersAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'generate_quiz', 'question', 'answer')
-    list_filter = ('generate_quiz__quiz_type', 'user',)
+    list_display = ('id', 'user', 'generate_quiz', 'question', 'answer', 'selected')
+    list_filter = ('generate_quiz__quiz_type', 'selected', 'user',)
     search_fields = (
         'user__username',
         'generate_quiz__numbers',
@@ -82,3 +174,61 @@ class AnswerUsersAdmin(admin.ModelAdmin):
         'answer__name'
     )
     ordering = ('id',)
+
+
+# --- Test raqamlari hisoblagichi ---
+@admin.register(QuizNumberCounter)
+class QuizNumberCounterAdmin(admin.ModelAdmin):
+    list_display = ('year', 'value')
+    ordering = ('-year',)
+
+
+# --- 7️⃣ Import vazifalari ---
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'quiz_type', 'status', 'processed', 'created_count', 'updated_count', 'skipped_count',
+                    'created_by', 'created', 'finished')
+    list_filter = ('status', 'quiz_type')
+    readonly_fields = ('processed', 'created_count', 'updated_count', 'skipped_count', 'problems', 'error',
+                       'started', 'finished', 'heartbeat', 'attempts')
+    ordering = ('-id',)
+
+
+# --- Profillangan so'rovlar ---
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'view_name', 'path', 'reason', 'duration_ms', 'samples', 'user', 'created', 'download_link')
+    list_filter = ('reason', 'view_name')
+    search_fields = ('path', 'view_name', 'user__username')
+    exclude = ('stacks',)
+    readonly_fields = ('path', 'view_name', 'user', 'reason', 'duration_ms', 'samples', 'created', 'download_link')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/collapsed/',
+                self.admin_site.admin_view(self.download_view),
+                name='quiz_requestprofile_download',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='Collapsed stacks')
+    def download_link(self, obj):
+        if not obj.pk:
+            return '-'
+        url = reverse('admin:quiz_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Yuklab olish</a>', url)
+
+    def download_view(self, request, pk):
+        """flamegraph.pl / speedscope uchun collapsed stacks fayli."""
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not self.has_view_permission(request, profile):
+            return redirect('admin:index')
+        response = HttpResponse(profile.stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.collapsed"'
+        return response
@@ -0,0 +1,155 @@
+# quiz/answers.py
+"""
+Foydalanuvchi javoblarini yozish va GenerateQuiz'dagi jonli hisoblagichlar
+(answered_count, correct_count). Hisoblagichlar har bir saqlashda faqat o'zgargan
+savollar bo'yicha farq (delta) bilan yangilanadi; to'g'ri javoblar testning keshdagi
+javob kalitidan olinadi — Answer jadvaliga join yo'q.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Answer, AnswerUsers, GenerateQuiz
+from .scoring import default_policy, question_credit, rescore_quizzes
+from .pool import bump_pool_version
+from .snapshot import SNAPSHOT_TIMEOUT, build_quiz_snapshot, quiz_cache_version, snapshot_key
+
+
+def answer_key_cache_key(quiz):
+    return f"quiz_answer_key:{quiz.id}:{quiz_cache_version(quiz)}"
+
+
+def get_answer_key(quiz):
+    """Test savollarining faol to'g'ri javoblari: {question_id: frozenset(answer_id, ...)} (keshda)."""
+    key = cache.get(answer_key_cache_key(quiz))
+    if key is None:
+        key = build_answer_key(quiz)
+    return key
+
+
+def build_answer_key(quiz):
+    question_ids = quiz.question_ids()
+    correct = {qid: set() for qid in question_ids}
+    for question_id, answer_id in Answer.objects.filter(
+        question_id__in=question_ids, is_correct=True, is_active=True
+    ).values_list('question_id', 'id'):
+        correct[question_id].add(answer_id)
+    key = {qid: frozenset(ids) for qid, ids in correct.items()}
+    cache.set(answer_key_cache_key(quiz), key, SNAPSHOT_TIMEOUT)
+    return key
+
+
+def get_quiz_state(quiz):
+    """Javob saqlash uchun snapshot va javob kaliti — bitta kesh murojaati (get_many)."""
+    keys = snapshot_key(quiz), answer_key_cache_key(quiz)
+    found = cache.get_many(keys)
+    snapshot = found.get(keys[0])
+    if snapshot is None:
+        snapshot = build_quiz_snapshot(quiz)
+    answer_key = found.get(keys[1])
+    if answer_key is None:
+        answer_key = build_answer_key(quiz)
+    return snapshot, answer_key
+
+
+def refresh_open_quizzes(quiz_type):
+    """
+    Savollarning javoblari almashtirilganda (qayta import): pool_version oshiriladi — shu turdagi
+    testlarning snapshot va javob kaliti kalitlari eskiradi (keyingi so'rovda qayta quriladi),
+    tugatilmagan testlarning jonli hisoblagichlari esa yangi kalit bo'yicha qayta hisoblanadi.
+    """
+    bump_pool_version([quiz_type.pk])
+    rescore_quizzes(GenerateQuiz.objects.filter(quiz_type=quiz_type, finished__isnull=True))
+
+
+def record_answers(quiz, user, changes, answer_key=None, locked=False):
+    """
+    Javob o'zgarishlarini bitta tranzaksiyada yozadi.
+    locked=True — chaqiruvchi test qatorini shu tranzaksiyada allaqachon qulflagan (lock_quiz).
+    answer_key berilmasa keshdan olinadi.
+    changes: {(question_id, choice): (answered_at, answer_id, selected)} — har bir kalit uchun
+    eng oxirgi o'zgarish. Bazadagi yozuv yangiroq bo'lsa, o'zgarish tashlab yuboriladi
+    (last-write-wins). Belgi olib tashlansa qator selected=False bilan qoladi — vaqti bilan
+    birga, shuning uchun undan eski o'zgarishlar ham tashlanadi. Natija: qo'llangan o'zgarishlar soni.
+    """
+    question_ids = {q_id for q_id, _ in changes}
+    # savepoint=False: chaqiruvchining tranzaksiyasi ichida qo'shimcha SAVEPOINT so'rovlari yo'q
+    with transaction.atomic(savepoint=False):
+        # Avval testning o'zi qulflanadi: hali yozuvi yo'q savolga parallel saqlashlar ham
+        # navbat bilan bajariladi va hisoblagichlarga farq ikki marta qo'shilmaydi
+        if not locked:
+            GenerateQuiz.objects.select_for_update().filter(id=quiz.id).values_list('id', flat=True).first()
+        stored = {}
+        chosen_before = {q_id: set() for q_id in question_ids}
+        for question_id, choice, answer_id, answered_at, selected in (
+            AnswerUsers.objects.select_for_update()
+            .filter(generate_quiz=quiz, question_id__in=question_ids)
+            .values_list('question_id', 'choice', 'answer_id', 'answered_at', 'selected')
+        ):
+            stored[(question_id, choice)] = (answered_at, answer_id)
+            if selected:
+                chosen_before[question_id].add(answer_id)
+
+        fresh = {
+            key: value for key, value in changes.items()
+            if key not in stored or stored[key][0] is None or value[0] >= stored[key][0]
+        }
+        # Bitta javobli savolda (choice=0) belgini olib tashlash yo'q — tanlov faqat almashadi
+        rows = [
+            AnswerUsers(user=user, generate_quiz=quiz, question_id=q_id, answer_id=a_id,
+                        choice=choice, answered_at=answered_at, selected=selected or not choice)
+            for (q_id, choice), (answered_at, a_id, selected) in fresh.items()
+        ]
+        if rows:
+            AnswerUsers.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['generate_quiz', 'question', 'choice'],
+                update_fields=['answer', 'answered_at', 'selected'],
+            )
+
+        # Savollar bo'yicha avvalgi va yangi tanlovlar — hisoblagichlar uchun farq
+        chosen_after = {q_id: set(ids) for q_id, ids in chosen_before.items()}
+        for (q_id, choice), (_, a_id, selected) in fresh.items():
+            if not choice:
+                chosen_after[q_id] = {a_id}
+            elif selected:
+                chosen_after[q_id].add(a_id)
+            else:
+                chosen_after[q_id].discard(a_id)
+        _update_counters(quiz, chosen_before, chosen_after, answer_key if answer_key is not None else get_answer_key(quiz))
+    return len(fresh)
+
+
+def lock_quiz(user, quiz_id):
+    """
+    Foydalanuvchining testi — egalik tekshiruvi va qator lock'i bitta SELECT ... FOR UPDATE bilan
+    (tranzaksiya ichida chaqiriladi). QuizType ham shu so'rovda (kesh kalitlari versiyasi uchun).
+    """
+    return (
+        GenerateQuiz.objects.select_for_update(of=('self',)).select_related('quiz_type')
+        .filter(id=quiz_id, user=user).first()
+    )
+
+
+def _update_counters(quiz, chosen_before, chosen_after, answer_key):
+    policy = default_policy()
+
+    def credit(question_id, chosen):
+        correct = answer_key.get(question_id, frozenset())
+        return question_credit(len(chosen & correct), len(chosen - correct), len(correct), policy)
+
+    answered_delta = 0
+    correct_delta = 0
+    for q_id, after in chosen_after.items():
+        before = chosen_before[q_id]
+        if before == after:
+            continue
+        answered_delta += bool(after) - bool(before)
+        correct_delta += credit(q_id, after) - credit(q_id, before)
+
+    if answered_delta or correct_delta:
+        GenerateQuiz.objects.filter(id=quiz.id).update(
+            answered_count=F('answered_count') + answered_delta,
+            correct_count=F('correct_count') + correct_delta,
+        )
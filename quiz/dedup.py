@@ -0,0 +1,166 @@
+# quiz/dedup.py
+"""
+Bir QuizType ichidagi deyarli bir xil savollarni topish (MinHash + LSH).
+Savollar juftma-juft solishtirilmaydi (O(n²)): har bir savol uchun
+MinHash imzosi numpy bilan vektorli hisoblanadi, so'ng LSH bandlari
+bo'yicha faqat bir "chelak"ka tushgan nomzodlar tekshiriladi.
+"""
+import re
+
+from .models import Question, Answer
+from .pool import bump_pool_version
+from .utils import normalize_text
+
+SHINGLE_SIZE = 5        # belgilar bo'yicha k-gram
+NUM_PERM = 64           # imzo uzunligi
+BANDS = 16              # LSH bandlari (NUM_PERM = BANDS * ROWS)
+THRESHOLD = 0.8         # taxminiy Jaccard o'xshashlik chegarasi
+
+_number_prefix = re.compile(r'^\s*\d+\.\s*')
+_punctuation = re.compile(r'[^\w\s]')
+
+
+def dedup_text(question_text, answer_texts):
+    """Raqam, tinish belgilari, \\xa0 va katta-kichik harflarsiz savol + saralangan javoblar matni."""
+    parts = [_number_prefix.sub('', question_text, count=1)]
+    parts.extend(sorted(answer_texts))
+    return normalize_text(_punctuation.sub(' ', ' '.join(parts)))
+
+
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    """
+    Barcha matnlarning k-gram xeshlari (uint32), bitta numpy massivda, matnlar tartibida.
+    Natija: (flat, lengths) — flat[sum(lengths[:i]) : ...] i-matnning shingle'lari.
+    Python'da har bir shingle bo'yicha sikl yo'q: rolling xesh butun massivga birdan hisoblanadi.
+    Takroriy shingle'lar olib tashlanmaydi — minimumga ta'sir qilmaydi.
+    """
+    import numpy as np
+
+    # Qisqa matnlar ham kamida bitta shingle bersin
+    texts = [t.ljust(k) for t in texts]
+    sizes = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer('\x00'.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+    # Polinomial xesh: h(p) = sum(codes[p+j] * B^(k-1-j)), uint64 da o'z-o'zidan mod 2^64
+    base = np.uint64(0x100000001B3)
+    count = len(codes) - k + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * base + codes[j:j + count]
+
+    # Matn chegarasidan o'tib ketgan k-gram'larni tashlaymiz
+    lengths = sizes - k + 1
+    starts = np.repeat(np.cumsum(sizes + 1) - (sizes + 1), sizes + 1)[:count]
+    valid = np.arange(count, dtype=np.int64) - starts < np.repeat(lengths, sizes + 1)[:count]
+    return (hashes[valid] >> np.uint64(32)).astype(np.uint32), lengths
+
+
+def minhash_signatures(flat, lengths, num_perm=NUM_PERM, seed=1):
+    """
+    (n, num_perm) o'lchamli MinHash imzolar (uint32).
+    Har bir "permutatsiya" — 32-bit xor-multiply-xorshift aralashtirish; har biri butun
+    shingle massiviga vektorli qo'llanadi va minimum.reduceat bilan matnlar bo'yicha olinadi.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    xors = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64).astype(np.uint32)
+    mults = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    signatures = np.empty((len(lengths), num_perm), dtype=np.uint32)
+    mixed = np.empty_like(flat)
+    for i in range(num_perm):
+        np.bitwise_xor(flat, xors[i], out=mixed)
+        np.multiply(mixed, mults[i], out=mixed)
+        np.bitwise_xor(mixed, mixed >> np.uint32(16), out=mixed)
+        signatures[:, i] = np.minimum.reduceat(mixed, offsets)
+    return signatures
+
+
+def lsh_clusters(signatures, bands=BANDS, threshold=THRESHOLD):
+    """
+    LSH: imzo `bands` ta bo'lakka bo'linadi, bo'lagi to'liq mos kelgan savollar nomzod bo'ladi.
+    Nomzodlar imzolar mosligi (taxminiy Jaccard) bilan tasdiqlanadi va union-find bilan guruhlanadi.
+    Natija: indekslar ro'yxatlari (har biri kamida 2 ta).
+    """
+    import numpy as np
+
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    mix = np.uint64(0x9E3779B97F4A7C15)
+    for band in range(bands):
+        # Band qatorlarini bitta uint64 kalitga yig'amiz (to'qnashuvlar keyin o'xshashlik bilan tekshiriladi)
+        keys = np.zeros(n, dtype=np.uint64)
+        for col in range(band * rows, (band + 1) * rows):
+            keys = keys * mix + signatures[:, col]
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Har bir elementning chelakdagi birinchi a'zosi (head)
+        starts = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        heads = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+        members = ~starts
+        if not members.any():
+            continue
+        others, heads = order[members], heads[members]
+        similarity = (signatures[others] == signatures[heads]).mean(axis=1)
+        for head, other in zip(heads[similarity >= threshold], others[similarity >= threshold]):
+            ra, rb = find(head), find(other)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+    roots = np.fromiter((find(i) for i in range(n)), dtype=np.int64, count=n)
+    groups = {}
+    for i in np.flatnonzero(np.bincount(roots, minlength=n)[roots] > 1):
+        groups.setdefault(roots[i], []).append(int(i))
+    return list(groups.values())
+
+
+def find_near_duplicates(quiz_type, threshold=THRESHOLD):
+    """
+    QuizType'dagi faol savollar orasidan deyarli bir xil guruhlarni qaytaradi.
+    Natija: [[question_id, ...], ...] — har guruh id bo'yicha saralangan (birinchisi eng eskisi).
+    """
+    questions = list(
+        Question.objects.filter(quiz_type=quiz_type, is_active=True)
+        .order_by('id')
+        .values_list('id', 'name')
+    )
+    if len(questions) < 2:
+        return []
+
+    answers = {}
+    for question_id, name in Answer.objects.filter(
+        question__quiz_type=quiz_type, question__is_active=True
+    ).values_list('question_id', 'name'):
+        answers.setdefault(question_id, []).append(name)
+
+    flat, lengths = shingle_hashes([dedup_text(name, answers.get(qid, [])) for qid, name in questions])
+    signatures = minhash_signatures(flat, lengths)
+    clusters = lsh_clusters(signatures, threshold=threshold)
+    return sorted(
+        (sorted(questions[i][0] for i in members) for members in clusters),
+        key=lambda ids: ids[0],
+    )
+
+
+def deactivate_duplicates(clusters):
+    """Har bir guruhning birinchi (eng eski) savolini qoldirib, qolganlarini nofaol qiladi."""
+    ids = [qid for cluster in clusters for qid in cluster[1:]]
+    if not ids:
+        return 0
+    questions = Question.objects.filter(id__in=ids, is_active=True)
+    quiz_type_ids = set(questions.values_list('quiz_type_id', flat=True).distinct())
+    count = questions.update(is_active=False)
+    # update() signal yubormaydi — savollar to'plami keshini o'zimiz eskirtiramiz
+    bump_pool_version(quiz_type_ids)
+    return count
@@ -0,0 +1,80 @@
+# quiz/docx_stream.py
+import zipfile
+from xml.etree import ElementTree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+P, T, TAB, BR, CR, TC, TR, BODY = (
+    f"{W}p", f"{W}t", f"{W}tab", f"{W}br", f"{W}cr", f"{W}tc", f"{W}tr", f"{W}body",
+)
+
+
+class DocxReadError(Exception):
+    """Word faylni ochib yoki o'qib bo'lmadi."""
+
+
+def iter_docx_lines(file):
+    """
+    .docx ichidagi word/document.xml ni zip'dan oqim (stream) sifatida o'qiydi
+    va matn qatorlarini HUJJATDAGI TARTIBDA qaytaradi (generator).
+    - Oddiy paragraf -> bitta qator.
+    - Jadval cell'i -> bitta qator (cell ichidagi paragraflar '\\n' bilan qo'shiladi).
+    Butun DOM xotirada saqlanmaydi: ishlov berilgan elementlar darhol tozalanadi.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+        stream = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise DocxReadError(e) from e
+
+    paragraphs = []  # ochiq paragraflar steki (ichma-ich paragraf bo'lishi mumkin)
+    cells = []       # ochiq jadval cell'lari steki
+    parents = []     # ochiq elementlar steki — tugagan elementni otasidan olib tashlash uchun
+
+    with archive, stream:
+        try:
+            for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    parents.append(elem)
+                    if tag == P:
+                        paragraphs.append([])
+                    elif tag == TC:
+                        cells.append([])
+                    continue
+
+                parents.pop()
+                done = False
+                if tag == T:
+                    if paragraphs and elem.text:
+                        paragraphs[-1].append(elem.text)
+                elif tag == TAB:
+                    if paragraphs:
+                        paragraphs[-1].append("\t")
+                elif tag in (BR, CR):
+                    if paragraphs:
+                        paragraphs[-1].append("\n")
+                elif tag == P:
+                    text = "".join(paragraphs.pop())
+                    # Ichma-ich paragraflar (masalan text box) e'tiborsiz qoladi
+                    if not paragraphs:
+                        done = True
+                        if cells:
+                            cells[-1].append(text)
+                        elif text.strip():
+                            yield text
+                elif tag == TC:
+                    done = True
+                    text = "\n".join(cells.pop())
+                    if text.strip():
+                        yield text
+                elif tag == TR:
+                    done = True
+
+                # Ishlov berilgan paragraf/cell/qator va body ning farzandlari darhol tashlanadi:
+                # bitta katta jadvaldan iborat hujjat ham jadval tugashini kutmaydi
+                if parents and (done or parents[-1].tag == BODY):
+                    elem.clear()
+                    parents[-1].remove(elem)
+        except ElementTree.ParseError as e:
+            raise DocxReadError(e) from e
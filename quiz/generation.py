@@ -0,0 +1,162 @@
+# quiz/generation.py
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GenerateQuiz, GenerateQuizQuestion, QuizNumberCounter
+from .pool import ensure_snapshot, get_question_pool
+
+# Olish (claim) uchun ko'rib chiqiladigan nomzodlar: bir vaqtda boshlaganlar bitta qatorga urilmasin
+CLAIM_CANDIDATES = 10
+# Har bir savolga beriladigan vaqt (sahifadagi taymer ham shunga tayanadi)
+MINUTES_PER_QUESTION = 1
+
+
+def quiz_deadline(started, question_count):
+    return started + timedelta(minutes=question_count * MINUTES_PER_QUESTION)
+
+
+def seed_mode():
+    """QUIZ_STORAGE_MODE = 'seed' — yangi testlar savol qatorlarisiz, seed bilan saqlanadi."""
+    return getattr(settings, 'QUIZ_STORAGE_MODE', 'links') == 'seed'
+
+
+def new_seed():
+    return random.getrandbits(63)
+
+
+def start_quiz(user, quiz_type, question_count):
+    """Sozlamaga qarab yangi test yaratadi (seed yoki savol qatorlari bilan)."""
+    if seed_mode():
+        return create_seeded_quiz(user, quiz_type, question_count)
+    return create_quiz(user, quiz_type, random.sample(get_question_pool(quiz_type), question_count))
+
+
+def create_seeded_quiz(user, quiz_type, question_count):
+    """
+    Ixcham test: faqat GenerateQuiz qatori (seed + pool_version). Savollar ro'yxati
+    GenerateQuiz.question_ids() da snapshot + seed'dan qayta hosil qilinadi.
+    """
+    ensure_snapshot(quiz_type)
+    numbers = QuizNumberCounter.allocate()[0]
+    return GenerateQuiz.objects.create(
+        user=user,
+        quiz_type=quiz_type,
+        numbers=numbers,
+        question_count=question_count,
+        pool_version=quiz_type.pool_version,
+        seed=new_seed(),
+        shuffle_answers=getattr(settings, 'QUIZ_SHUFFLE_ANSWERS', False),
+        deadline=quiz_deadline(timezone.now(), question_count),
+    )
+
+
+def create_quiz(user, quiz_type, question_ids):
+    """
+    Foydalanuvchi uchun test yaratadi: GenerateQuiz + savollar (tartibi position ustunida).
+    Savollar bitta bulk_create bilan yoziladi — savollar soniga bog'liq bo'lmagan INSERT'lar soni.
+    """
+    # Test raqami tranzaksiyadan oldin ajratiladi: hisoblagich qatori lock'i qisqa tursin
+    numbers = QuizNumberCounter.allocate()[0]
+
+    with transaction.atomic():
+        quiz = GenerateQuiz.objects.create(
+            user=user,
+            quiz_type=quiz_type,
+            numbers=numbers,
+            question_count=len(question_ids),
+            pool_version=quiz_type.pool_version,
+            deadline=quiz_deadline(timezone.now(), len(question_ids)),
+        )
+        GenerateQuizQuestion.objects.bulk_create([
+            GenerateQuizQuestion(quiz=quiz, question_id=qid, position=position)
+            for position, qid in enumerate(question_ids)
+        ])
+    return quiz
+
+
+def pregenerate_quizzes(quiz_type, question_count, size):
+    """
+    Hali egasi yo'q (user=NULL) `size` ta testni oldindan tayyorlaydi.
+    Raqamlar bitta blok bilan ajratiladi, testlar va savollar ikkita bulk_create bilan yoziladi
+    (seed rejimida — faqat testlar).
+    """
+    pool = get_question_pool(quiz_type)
+    question_count = min(question_count, len(pool))
+    if not question_count:
+        return 0
+
+    numbers = QuizNumberCounter.allocate(size)
+    if seed_mode():
+        ensure_snapshot(quiz_type)
+        shuffle_answers = getattr(settings, 'QUIZ_SHUFFLE_ANSWERS', False)
+        return len(GenerateQuiz.objects.bulk_create([
+            GenerateQuiz(
+                quiz_type=quiz_type,
+                numbers=number,
+                question_count=question_count,
+                pool_version=quiz_type.pool_version,
+                seed=new_seed(),
+                shuffle_answers=shuffle_answers,
+            )
+            for number in numbers
+        ]))
+
+    with transaction.atomic():
+        quizzes = GenerateQuiz.objects.bulk_create([
+            GenerateQuiz(
+                quiz_type=quiz_type,
+                numbers=number,
+                question_count=question_count,
+                pool_version=quiz_type.pool_version,
+            )
+            for number in numbers
+        ])
+        GenerateQuizQuestion.objects.bulk_create(
+            [
+                GenerateQuizQuestion(quiz=quiz, question_id=qid, position=position)
+                for quiz in quizzes
+                for position, qid in enumerate(random.sample(pool, question_count))
+            ],
+            batch_size=1000,
+        )
+    return len(quizzes)
+
+
+def claim_pregenerated(user, quiz_type, question_count):
+    """
+    Oldindan tayyorlangan testni foydalanuvchiga biriktiradi.
+    Biriktirish — bitta shartli UPDATE ... WHERE user IS NULL: ikki foydalanuvchi bitta testni ololmaydi.
+    Savollar to'plami o'zgargan (pool_version mos emas) testlar berilmaydi.
+    Natija: GenerateQuiz.id yoki None (tayyor test qolmagan).
+    """
+    candidates = list(
+        GenerateQuiz.objects.filter(
+            user__isnull=True,
+            quiz_type=quiz_type,
+            question_count=question_count,
+            pool_version=quiz_type.pool_version,
+        ).values_list('id', flat=True)[:CLAIM_CANDIDATES]
+    )
+    random.shuffle(candidates)
+    for quiz_id in candidates:
+        now = timezone.now()
+        claimed = GenerateQuiz.objects.filter(id=quiz_id, user__isnull=True).update(
+            user=user,
+            created=now,
+            deadline=quiz_deadline(now, question_count),
+        )
+        if claimed:
+            return quiz_id
+    return None
+
+
+def purge_stale_pregenerated(quiz_type):
+    """Savollar to'plami o'zgarib qolgan, hech kim olmagan testlarni o'chiradi."""
+    _, deleted = GenerateQuiz.objects.filter(user__isnull=True, quiz_type=quiz_type).exclude(
+        pool_version=quiz_type.pool_version
+    ).delete()
+    return deleted.get(GenerateQuiz._meta.label, 0)
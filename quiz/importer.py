@@ -0,0 +1,279 @@
+# quiz/importer.py
+import re
+from contextlib import nullcontext
+
+from django.db import transaction
+
+from .answers import refresh_open_quizzes
+from .models import Question, Answer
+from .pool import bump_pool_version
+from .utils import normalize_text, question_content_hash, question_text_hash
+
+
+# regex: boshida raqam + nuqta (masalan "1. " yoki "12. ")
+q_pattern = re.compile(r'^\s*(\d+)\.\s*(.*)')
+
+# Bitta bulk_create so'roviga ketadigan qatorlar soni
+BATCH_SIZE = 500
+
+
+def iter_question_blocks(lines):
+    """
+    Matn qatorlarini savol-javob bloklariga ajratadi.
+    - '1. ' kabi raqam+nuqta bilan boshlangan qator yangi savol hisoblanadi.
+    - Keyingi savolgacha bo'lgan qatorlar javob variantlari hisoblanadi.
+    Har bir blok: (q_text, [answer_lines...])
+    """
+    current_q = None
+    current_answers = []
+
+    for line in lines:
+        # Tozalash (no-break space ham)
+        line = line.replace("\xa0", " ").strip()
+        if not line:
+            continue
+
+        m = q_pattern.match(line)
+        if m:
+            # yangi savol topildi -> avvalgisini qaytaramiz
+            if current_q is not None:
+                yield current_q, current_answers
+            num = m.group(1)
+            rest = m.group(2).strip()
+            # Agar savol matn bo'sh bo'lsa, butun line ni savol sifatida olamiz
+            if not rest:
+                rest = line
+            current_q = f"{num}. {rest}"
+            current_answers = []
+        else:
+            # Savoldan oldingi qatorlar (sarlavha va h.k.) e'tiborsiz qoladi
+            if current_q is not None:
+                current_answers.append(line)
+
+    # Oxirgi savol
+    if current_q is not None:
+        yield current_q, current_answers
+
+
+def parse_answer_line(line):
+    """
+    Javob qatorini (text, is_correct) ga aylantiradi.
+    To'g'ri javob belgisi: boshida '*' yoki (kam hollarda) qator ichida '*'.
+    """
+    text = line
+    is_correct = False
+    if text.startswith("*"):
+        is_correct = True
+        text = text[1:].strip()
+    elif "*" in text:
+        is_correct = True
+        text = text.replace("*", "").strip()
+    return text.strip(), is_correct
+
+
+def import_question_blocks(quiz_type, blocks, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Savol bloklarini batch'lab upsert qiladi (content_hash, so'ng text_hash bo'yicha):
+    - yangi savol -> bulk_create (savol + javoblar);
+    - mavjud savol, to'g'ri javoblari o'zgargan -> javoblar yangilanadi (updated);
+    - xeshi topilmadi, lekin shu turda aynan bitta savol shu matn bilan bor -> savol matni va
+      javoblar to'plami yangilanadi (updated).
+      Ikkala holatda ham eski javob qatorlari tahrirlanmaydi: mos kelmaganlari nofaol bo'ladi,
+      yangilari qo'shiladi (_sync_answers), davom etayotgan testlarning keshi tozalanadi;
+    - mavjud va o'zgarmagan yoki fayl ichida takrorlangan -> o'tkazib yuboriladi (skipped).
+    Dublikatlar har batch uchun bitta `content_hash__in` so'rovi bilan (unique indeks orqali) topiladi.
+    correct_count va is_multiple_choice xotirada '*' belgilangan javoblar sonidan hisoblanadi,
+    shuning uchun Answer.save() chaqirilmaydi va so'rovlar soni qatorlarga bog'liq emas.
+    - on_batch berilmasa: butun import bitta tranzaksiyada.
+    - on_batch berilsa: har bir batch alohida commit qilinadi va
+      on_batch(processed, stats, problems) shu batch tranzaksiyasi ichida chaqiriladi
+      (fon import vazifasi progressini yozish uchun).
+    Natija: (stats, problems), stats = {'inserted': .., 'updated': .., 'skipped': ..}
+    """
+    processed = 0
+    stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    problems = []
+    seen = set()  # shu importda uchragan xeshlar
+    pending = {}  # content_hash -> (Question, [(text, is_correct), ...])
+    claimed = set()  # shu importda yangilangan savollar — ikkinchi marta matn bo'yicha tanlanmaydi
+
+    def flush():
+        with transaction.atomic(savepoint=False):
+            existing = dict(
+                Question.objects.filter(quiz_type=quiz_type, content_hash__in=list(pending))
+                .values_list('content_hash', 'id')
+            )
+            changed = _update_existing(existing, pending, stats) if existing else []
+            claimed.update(existing.values())
+
+            by_text = _match_by_text(
+                quiz_type, {h: item for h, item in pending.items() if h not in existing}, claimed
+            )
+            if by_text:
+                changed += _replace_answer_sets(by_text, pending, stats)
+            claimed.update(by_text.values())
+            if changed:
+                # Davom etayotgan testlar keshdagi eski javoblar bilan qolmasin
+                refresh_open_quizzes(quiz_type)
+
+            new = [
+                item for content_hash, item in pending.items()
+                if content_hash not in existing and content_hash not in by_text
+            ]
+            questions = Question.objects.bulk_create(
+                [q for q, _ in new], batch_size=batch_size
+            )
+            Answer.objects.bulk_create(
+                [
+                    Answer(question=q, name=text, is_correct=is_correct)
+                    for q, (_, answers) in zip(questions, new)
+                    for text, is_correct in answers
+                ],
+                batch_size=batch_size,
+            )
+            stats['inserted'] += len(questions)
+            if questions:
+                # bulk_create signal yubormaydi — savollar to'plami keshini o'zimiz eskirtiramiz
+                bump_pool_version([quiz_type.pk])
+            if on_batch is not None:
+                on_batch(processed, stats, problems)
+        pending.clear()
+
+    with transaction.atomic() if on_batch is None else nullcontext():
+        for q_text, answer_lines in blocks:
+            processed += 1
+            answers = [a for a in map(parse_answer_line, answer_lines) if a[0]]
+            # Ba'zi bloklar savol bilan javobsiz kelishi mumkin
+            if not answers:
+                problems.append(f"'{q_text}' uchun javob topilmadi")
+                continue
+
+            content_hash = question_content_hash(q_text, [text for text, _ in answers])
+            # Fayl ichida takrorlangan savol
+            if content_hash in seen:
+                stats['skipped'] += 1
+                continue
+            seen.add(content_hash)
+
+            correct = sum(1 for _, is_correct in answers if is_correct)
+            question = Question(
+                quiz_type=quiz_type,
+                name=q_text,
+                is_multiple_choice=correct > 1,
+                correct_count=correct,
+                content_hash=content_hash,
+                text_hash=question_text_hash(q_text),
+            )
+            pending[content_hash] = (question, answers)
+            if len(pending) >= batch_size:
+                flush()
+
+        # Oxirgi (to'liq bo'lmagan) batch; on_batch yakuniy progressni ham yozsin
+        if pending or on_batch is not None:
+            flush()
+
+    return stats, problems
+
+
+def _update_existing(existing, pending, stats):
+    """Bazada bor savollarning to'g'ri javob belgilarini fayldagi bilan solishtiradi va farqini yozadi."""
+    by_question = _active_answers(existing.values())
+    changed = {}
+    for content_hash, question_id in existing.items():
+        # Xesh bir xil -> javob matnlari ham bir xil; faqat is_correct farq qilishi mumkin
+        _, answers = pending[content_hash]
+        wanted = {normalize_text(text): is_correct for text, is_correct in answers}
+        if all(wanted.get(normalize_text(a.name), a.is_correct) == a.is_correct
+               for a in by_question.get(question_id, [])):
+            stats['skipped'] += 1
+            continue
+        # Admin nofaol qilgan javoblar qayta qo'shilmaydi — faqat faollari solishtiriladi
+        active = {normalize_text(a.name) for a in by_question.get(question_id, [])}
+        changed[question_id] = [(text, is_correct) for text, is_correct in answers if normalize_text(text) in active]
+        stats['updated'] += 1
+    _sync_answers(changed, by_question)
+    return list(changed)
+
+
+def _match_by_text(quiz_type, unmatched, claimed):
+    """
+    Xeshi topilmagan savollar uchun text_hash bo'yicha bitta so'rov: {content_hash: question_id}.
+    Faqat shu turda aynan bitta savol shu matn bilan bo'lsa (umumiy "To'g'ri javobni toping"
+    kabi matnlar birlashtirilmaydi) va u shu importda hali yangilanmagan bo'lsa.
+    """
+    wanted, repeated = {}, set()
+    for content_hash, (question, _) in unmatched.items():
+        if question.text_hash in wanted:
+            repeated.add(question.text_hash)  # shu faylda bir xil matnli ikki xil savol
+        wanted[question.text_hash] = content_hash
+    for text_hash in repeated:
+        del wanted[text_hash]
+    if not wanted:
+        return {}
+    candidates = {}
+    for text_hash, question_id in Question.objects.filter(
+        quiz_type=quiz_type, text_hash__in=list(wanted)
+    ).values_list('text_hash', 'id'):
+        candidates.setdefault(text_hash, []).append(question_id)
+    return {
+        wanted[text_hash]: ids[0]
+        for text_hash, ids in candidates.items()
+        if len(ids) == 1 and ids[0] not in claimed
+    }
+
+
+def _replace_answer_sets(matches, pending, stats):
+    """
+    Javoblar to'plami o'zgargan savollarni fayldagi holatga keltiradi (savol id'si va tarix saqlanadi).
+    Savol matni va xeshlari yangilanadi, javoblar _sync_answers orqali.
+    """
+    by_question = _active_answers(matches.values())
+    questions = []
+    for content_hash, question_id in matches.items():
+        question, _ = pending[content_hash]
+        questions.append(Question(
+            id=question_id, name=question.name, content_hash=content_hash, text_hash=question.text_hash,
+        ))
+        stats['updated'] += 1
+    Question.objects.bulk_update(questions, ['name', 'content_hash', 'text_hash'])
+    _sync_answers({question_id: pending[h][1] for h, question_id in matches.items()}, by_question)
+    return list(matches.values())
+
+
+def _active_answers(question_ids):
+    by_question = {}
+    for answer in Answer.objects.filter(question_id__in=list(question_ids), is_active=True).order_by('id'):
+        by_question.setdefault(answer.question_id, []).append(answer)
+    return by_question
+
+
+def _sync_answers(wanted, by_question):
+    """
+    wanted: {question_id: [(text, is_correct), ...]} — fayldagi javoblar.
+    Mavjud Answer qatorlarining matni va is_correct'i HECH QACHON o'zgartirilmaydi: ularga tarixdagi
+    AnswerUsers qatorlari bog'langan (natija sahifasi va qayta baholash shu qiymatlarni o'qiydi).
+    Matni va belgisi fayldagi bilan bir xil faol javob qoladi; qolgan faol javoblar nofaol qilinadi,
+    fayldagi yangi (yoki belgisi o'zgargan) javoblar yangi qator sifatida qo'shiladi.
+    correct_count faqat faol javoblardan bitta UPDATE bilan qayta hisoblanadi.
+    """
+    if not wanted:
+        return
+    retired, new_answers = [], []
+    for question_id, answers in wanted.items():
+        old = {}
+        for answer in by_question.get(question_id, []):
+            old.setdefault((normalize_text(answer.name), answer.is_correct), answer)
+        kept = set()
+        for text, is_correct in answers:
+            answer = old.get((normalize_text(text), is_correct))
+            if answer is not None and answer.id not in kept:
+                kept.add(answer.id)
+            else:
+                new_answers.append(Answer(question_id=question_id, name=text, is_correct=is_correct))
+        retired.extend(a.id for a in by_question.get(question_id, []) if a.id not in kept)
+
+    if retired:
+        Answer.objects.filter(id__in=retired).update(is_active=False)
+    if new_answers:
+        Answer.objects.bulk_create(new_answers)
+    Question.recount_correct(list(wanted))
@@ -0,0 +1,146 @@
+# quiz/jobs.py
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importer import iter_question_blocks, import_question_blocks
+from .models import ImportJob, ImportJobChunk
+
+logger = logging.getLogger(__name__)
+
+# Job qatorida saqlanadigan muammolar soni chegarasi
+MAX_PROBLEMS = 200
+# Shuncha vaqt heartbeat yangilanmagan 'running' vazifa — worker o'lgan deb hisoblanadi
+JOB_TIMEOUT = timedelta(minutes=15)
+# Qayta navbatga qo'yishlar chegarasi; undan keyin vazifa 'failed' bo'ladi
+MAX_ATTEMPTS = 3
+# Yuklangan fayl bazaga shu o'lchamdagi bo'laklar bilan yoziladi — xotirada bittadan ortiq bo'lak yo'q
+CHUNK_SIZE = 1024 * 1024
+
+
+class JobReclaimed(Exception):
+    """Vazifa boshqa worker'ga o'tib ketgan — joriy batch bekor qilinadi."""
+
+
+def reclaim_stale_jobs(now=None):
+    """
+    Eskirgan 'running' vazifalarni qayta 'pending' ga qaytaradi (MAX_ATTEMPTS dan oshganini 'failed' qiladi).
+    Import idempotent (content_hash bo'yicha upsert), shuning uchun vazifani boshidan qayta bajarish xavfsiz.
+    """
+    now = now or timezone.now()
+    stale = ImportJob.objects.filter(status=ImportJob.STATUS_RUNNING).filter(
+        Q(heartbeat__lt=now - JOB_TIMEOUT) | Q(heartbeat__isnull=True, started__lt=now - JOB_TIMEOUT)
+    )
+    dead = list(stale.filter(attempts__gte=MAX_ATTEMPTS).values_list('id', flat=True))
+    if dead:
+        ImportJob.objects.filter(id__in=dead).update(
+            status=ImportJob.STATUS_FAILED,
+            error="Worker javob bermay qoldi (vazifa bir necha marta to‘xtab qoldi).",
+            finished=now,
+        )
+        ImportJobChunk.objects.filter(job_id__in=dead).delete()
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=ImportJob.STATUS_PENDING)
+
+
+def claim_next_job():
+    """
+    Navbatdagi eng eski 'pending' vazifani oladi (avval eskirgan 'running' vazifalar qaytariladi).
+    UPDATE ... WHERE status='pending' sharti bir nechta worker bitta vazifani olishiga yo'l qo'ymaydi.
+    """
+    reclaim_stale_jobs()
+    while True:
+        job_id = (
+            ImportJob.objects.filter(status=ImportJob.STATUS_PENDING)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status=ImportJob.STATUS_PENDING).update(
+            status=ImportJob.STATUS_RUNNING,
+            started=now,
+            heartbeat=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ImportJob.objects.select_related('quiz_type').get(id=job_id)
+
+
+def run_import_job(job):
+    """
+    Bitta import vazifasini batch'lab bajaradi; har bir batch bilan birga progress va heartbeat ham commit qilinadi.
+    Vazifa qayta navbatga qo'yilgan bo'lsa (heartbeat kechikdi), batch bekor qilinadi va worker to'xtaydi.
+    """
+    # Parser faqat worker ichida kerak
+    from .docx_stream import iter_docx_lines, DocxReadError
+
+    def save_progress(processed, stats, problems):
+        updated = _own(job).update(
+            heartbeat=timezone.now(),
+            processed=processed,
+            created_count=stats['inserted'],
+            updated_count=stats['updated'],
+            skipped_count=stats['skipped'],
+            problems=problems[:MAX_PROBLEMS],
+        )
+        if not updated:
+            raise JobReclaimed
+
+    try:
+        with _open_upload(job) as f:
+            blocks = iter_question_blocks(iter_docx_lines(f))
+            stats, problems = import_question_blocks(job.quiz_type, blocks, on_batch=save_progress)
+    except JobReclaimed:
+        logger.warning("Import #%s boshqa worker'ga o'tdi, to'xtatildi", job.id)
+        return
+    except DocxReadError as e:
+        _fail(job, f"Word faylni o‘qib bo‘lmadi: {e}")
+        return
+    except Exception as e:
+        logger.exception("Import #%s bajarilmadi", job.id)
+        _fail(job, str(e))
+        return
+
+    if not any(stats.values()) and not problems:
+        _fail(job, "Faylda savollar topilmadi. Iltimos formatni tekshiring (1. Savol ...).")
+        return
+
+    if _own(job).update(status=ImportJob.STATUS_DONE, finished=timezone.now()):
+        # Fayl endi kerak emas
+        ImportJobChunk.objects.filter(job_id=job.id).delete()
+
+
+def save_upload(job, file, chunk_size=CHUNK_SIZE):
+    """
+    Yuklangan faylni bazaga bo'laklab yozadi (web va worker alohida konteynerda bo'lsa ham ishlaydi).
+    Katta fayl Django'da vaqtinchalik faylda turadi — xotirada faqat bitta bo'lak bo'ladi.
+    """
+    for index, chunk in enumerate(file.chunks(chunk_size)):
+        ImportJobChunk.objects.create(job=job, index=index, data=chunk)
+
+
+def _own(job):
+    """Shu worker olgan urinish: boshqa worker qayta olgan bo'lsa attempts farq qiladi."""
+    return ImportJob.objects.filter(id=job.id, status=ImportJob.STATUS_RUNNING, attempts=job.attempts)
+
+
+def _open_upload(job):
+    """
+    Bo'laklarni bittadan o'qib worker'ning vaqtinchalik fayliga ko'chiradi: zipfile'ga seek qilinadigan
+    fayl kerak, xotirada esa bir vaqtda bitta bo'lak turadi.
+    """
+    f = tempfile.TemporaryFile()
+    for (data,) in job.chunks.order_by('index').values_list('data').iterator(chunk_size=1):
+        f.write(data)
+    f.seek(0)
+    return f
+
+
+def _fail(job, error):
+    if _own(job).update(status=ImportJob.STATUS_FAILED, error=error, finished=timezone.now()):
+        ImportJobChunk.objects.filter(job_id=job.id).delete()
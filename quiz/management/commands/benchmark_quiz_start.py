@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quiz.generation import create_quiz
+from quiz.models import GenerateQuiz, GenerateQuizQuestion, Question, QuizNumberCounter, QuizType
+
+
+class _Rollback(Exception):
+    pass
+
+
+def create_quiz_per_row(user, quiz_type, question_ids):
+    """Eski usul (taqqoslash uchun): har bir savol uchun alohida INSERT."""
+    numbers = QuizNumberCounter.allocate()[0]
+    with transaction.atomic():
+        quiz = GenerateQuiz.objects.create(user=user, quiz_type=quiz_type, numbers=numbers)
+        for position, qid in enumerate(question_ids):
+            GenerateQuizQuestion.objects.create(quiz=quiz, question_id=qid, position=position)
+    return quiz
+
+
+class Command(BaseCommand):
+    help = (
+        "Test boshlash (GenerateQuiz + savollar) kechikishini o'lchaydi: har qator INSERT va bulk_create. "
+        "Barcha ma'lumotlar vaqtinchalik, oxirida rollback qilinadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--repeat', type=int, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['sizes'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, sizes, repeat):
+        user = User.objects.create(username='__benchmark__')
+        quiz_type = QuizType.objects.create(name='__benchmark__')
+        Question.objects.bulk_create(
+            Question(quiz_type=quiz_type, name=f"Savol {i}") for i in range(max(sizes))
+        )
+        question_ids = list(quiz_type.questions.values_list('id', flat=True))
+
+        self.stdout.write(f"{'savollar':>9} {'oldin (ms)':>12} {'keyin (ms)':>12} {'tezlashish':>11}")
+        for size in sizes:
+            ids = question_ids[:size]
+            before = self._measure(create_quiz_per_row, user, quiz_type, ids, repeat)
+            after = self._measure(create_quiz, user, quiz_type, ids, repeat)
+            self.stdout.write(f"{size:>9} {before:>12.2f} {after:>12.2f} {before / after:>10.1f}x")
+
+    @staticmethod
+    def _measure(func, user, quiz_type, ids, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(user, quiz_type, ids)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
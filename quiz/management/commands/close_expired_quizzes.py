@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.scoring import POLICIES, close_expired_quizzes
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan, tugatilmay qolgan testlarni baholab yopadi (cron yoki --loop bilan)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', choices=POLICIES, help="Baholash siyosati (standart: QUIZ_SCORING_POLICY)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Bitta bulk_update dagi testlar soni")
+        parser.add_argument('--loop', action='store_true', help="To'xtamasdan ishlash (fon worker)")
+        parser.add_argument('--sleep', type=float, default=60.0, help="--loop rejimida tekshiruvlar orasidagi kutish (soniya)")
+
+    def handle(self, *args, **options):
+        while True:
+            closed = close_expired_quizzes(policy=options['policy'], chunk_size=options['chunk_size'])
+            if closed or not options['loop']:
+                self.stdout.write(f"{closed} ta muddati o'tgan test yopildi.")
+            if not options['loop']:
+                return
+            time.sleep(options['sleep'])
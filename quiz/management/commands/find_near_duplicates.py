@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.dedup import THRESHOLD, deactivate_duplicates, find_near_duplicates
+from quiz.models import Question, QuizType
+
+
+class Command(BaseCommand):
+    help = "QuizType ichida deyarli bir xil savollar guruhlarini topadi (MinHash + LSH)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_type_ids', nargs='*', type=int, help="QuizType id'lari (bo'sh bo'lsa — barcha faollari)")
+        parser.add_argument('--threshold', type=float, default=THRESHOLD, help="O'xshashlik chegarasi (0..1)")
+        parser.add_argument('--show', type=int, default=50, help="Nechta guruhni chiqarish")
+        parser.add_argument('--deactivate', action='store_true', help="Har guruhda eng eskisini qoldirib, qolganlarini nofaol qilish")
+
+    def handle(self, *args, **options):
+        quiz_types = QuizType.objects.filter(is_active=True)
+        if options['quiz_type_ids']:
+            quiz_types = QuizType.objects.filter(id__in=options['quiz_type_ids'])
+
+        for quiz_type in quiz_types.order_by('id'):
+            started = time.monotonic()
+            clusters = find_near_duplicates(quiz_type, threshold=options['threshold'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{quiz_type} (#{quiz_type.id}): {len(clusters)} ta guruh, "
+                f"{sum(len(c) - 1 for c in clusters)} ta dublikat ({elapsed:.2f} s)"
+            )
+
+            shown = clusters[:options['show']]
+            names = dict(
+                Question.objects.filter(id__in=[qid for c in shown for qid in c]).values_list('id', 'name')
+            )
+            for cluster in shown:
+                self.stdout.write("  - " + " | ".join(f"#{qid} {names[qid][:60]}" for qid in cluster))
+
+            if options['deactivate'] and clusters:
+                count = deactivate_duplicates(clusters)
+                self.stdout.write(self.style.SUCCESS(f"  {count} ta savol nofaol qilindi"))
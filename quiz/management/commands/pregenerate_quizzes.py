@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.generation import pregenerate_quizzes, purge_stale_pregenerated
+from quiz.models import GenerateQuiz, QuizType
+
+
+class Command(BaseCommand):
+    help = "Imtihon oldidan QuizType uchun egasiz testlar to'plamini tayyorlaydi (generate_quiz ularni bitta UPDATE bilan oladi)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_type_id', type=int)
+        parser.add_argument('--count', type=int, default=10, help="Har bir testdagi savollar soni (?count= bilan bir xil)")
+        parser.add_argument('--size', type=int, default=100, help="Nechta test tayyorlash")
+        parser.add_argument('--purge-stale', action='store_true', help="Savollar to'plami o'zgargan eski tayyor testlarni o'chirish")
+
+    def handle(self, *args, **options):
+        try:
+            quiz_type = QuizType.objects.get(pk=options['quiz_type_id'])
+        except QuizType.DoesNotExist:
+            raise CommandError(f"QuizType #{options['quiz_type_id']} topilmadi")
+
+        if options['purge_stale']:
+            purged = purge_stale_pregenerated(quiz_type)
+            self.stdout.write(f"{purged} ta eskirgan tayyor test o'chirildi.")
+
+        created = pregenerate_quizzes(quiz_type, options['count'], options['size'])
+        available = GenerateQuiz.objects.filter(
+            user__isnull=True, quiz_type=quiz_type, pool_version=quiz_type.pool_version,
+        ).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} ta test tayyorlandi. '{quiz_type}' uchun jami tayyor testlar: {available}."
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.jobs import claim_next_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Word import vazifalarini navbatdan olib bajaradi (fon worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbat bo'shagach to'xtash")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Navbat bo'sh bo'lganda kutish (soniya)")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f"Import #{job.id} boshlandi ({job.quiz_type})")
+            run_import_job(job)
+            job.refresh_from_db()
+            self.stdout.write(
+                f"Import #{job.id}: {job.get_status_display()}, "
+                f"{job.created_count} ta yangi, {job.updated_count} ta yangilangan, "
+                f"{job.skipped_count} ta o'zgarmagan savol, {len(job.problems)} ta muammo"
+            )
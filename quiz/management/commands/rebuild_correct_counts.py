@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import Question
+
+
+class Command(BaseCommand):
+    help = "Question.correct_count va is_multiple_choice ni Answer jadvalidan qayta hisoblaydi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz-type', type=int, action='append', dest='quiz_types', help="Faqat shu QuizType (bir necha marta berish mumkin)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Bitta UPDATE dagi savollar soni")
+
+    def handle(self, *args, **options):
+        questions = Question.objects.order_by('id')
+        if options['quiz_types']:
+            questions = questions.filter(quiz_type_id__in=options['quiz_types'])
+
+        updated = 0
+        last_id = 0
+        chunk_size = options['chunk_size']
+        while True:
+            ids = list(questions.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            updated += Question.recount_correct(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"{updated} ta savol qayta hisoblandi."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import GenerateQuiz
+from quiz.scoring import POLICIES, default_policy, rescore_quizzes
+
+
+class Command(BaseCommand):
+    help = "Tugatilgan testlarning score'ini baholash siyosati bo'yicha qayta hisoblaydi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz-type', type=int, action='append', dest='quiz_types', help="Faqat shu QuizType (bir necha marta berish mumkin)")
+        parser.add_argument('--policy', choices=POLICIES, help="Baholash siyosati (standart: QUIZ_SCORING_POLICY)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Bitta baholash so'rovidagi testlar soni")
+        parser.add_argument('--include-unfinished', action='store_true', help="Tugatilmagan testlarni ham baholash")
+
+    def handle(self, *args, **options):
+        quizzes = GenerateQuiz.objects.filter(user__isnull=False)
+        if not options['include_unfinished']:
+            quizzes = quizzes.filter(finished__isnull=False)
+        if options['quiz_types']:
+            quizzes = quizzes.filter(quiz_type_id__in=options['quiz_types'])
+
+        policy = options['policy'] or default_policy()
+        changed = rescore_quizzes(quizzes, policy=policy, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{changed} ta testning natijasi o'zgardi ({policy})."))
@@ -0,0 +1,300 @@
+# quiz/middleware.py
+"""
+So'rovlar o'lchovi (ixtiyoriy): SQL so'rovlari soni va jami vaqti, eng sekin so'rovlar
+(normallashtirilgan ko'rinishda), shablon render va sessiya yuklash/saqlash vaqti.
+Natija `Server-Timing` sarlavhasiga yoziladi va URL nomi bo'yicha xotiradagi oxirgi
+QUIZ_METRICS_WINDOW ta o'lchovga qo'shiladi — request_metrics sahifasi p50/p95/p99 ni beradi.
+
+QUIZ_METRICS_SAMPLE_RATE — o'lchanadigan so'rovlar ulushi (0..1). 0 bo'lsa middleware
+umuman ulanmaydi (MiddlewareNotUsed); o'lchanmagan so'rov uchun bitta random() chaqiruvi.
+SQL connection.execute_wrapper orqali o'lchanadi, shuning uchun DEBUG=False da ham ishlaydi.
+
+RequestProfilerMiddleware — alohida so'rovlar uchun statistik profil: QUIZ_PROFILE_SAMPLE_RATE
+ulushidagi so'rovlar yoki superuser QUIZ_PROFILE_HEADER sarlavhasi bilan yuborgan so'rov.
+Yon oqim har QUIZ_PROFILE_INTERVAL soniyada so'rov oqimining stekini o'qiydi; natija
+(collapsed stacks) RequestProfile'ga yoziladi va admin'dan yuklab olinadi.
+"""
+import heapq
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+# Har bir so'rovdan saqlanadigan eng sekin SQL'lar soni
+SLOWEST_STATEMENTS = 3
+PERCENTILES = (50, 95, 99)
+
+Sample = namedtuple('Sample', 'total sql queries template session slowest')
+
+# Joriy (o'lchanayotgan) so'rov statistikasi — shablon renderi shu orqali topiladi
+_current = threading.local()
+# URL nomi -> deque(Sample): jarayon ichidagi aylanma oyna
+_samples = {}
+_samples_lock = threading.Lock()
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def sql_fingerprint(sql):
+    """So'rov shakli: literal va parametrlar '?', IN/VALUES ro'yxatlari '(...)' ga qisqartiriladi."""
+    sql = _LITERAL.sub('?', sql).replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    sql = _REPEATED_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class RequestStats:
+    """Bitta so'rov davomidagi o'lchovlar; o'zi execute_wrapper sifatida ulanadi."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.session = 0.0
+        self.rendering = False
+        self._slowest = []  # (vaqt, tartib raqami, sql) — kichik uyum
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.sql += elapsed
+            item = (elapsed, self.queries, sql)
+            if len(self._slowest) < SLOWEST_STATEMENTS:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    def slowest(self):
+        """Eng sekin so'rovlar: [(fingerprint, ms), ...] — sekinidan boshlab."""
+        return [(sql_fingerprint(sql), elapsed * 1000) for elapsed, _, sql in sorted(self._slowest, reverse=True)]
+
+    def timed(self, method, field):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                setattr(self, field, getattr(self, field) + time.perf_counter() - start)
+        return wrapper
+
+    def server_timing(self, total):
+        return (
+            f'total;dur={total * 1000:.1f}, '
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries", '
+            f'template;dur={self.template * 1000:.1f}, '
+            f'session;dur={self.session * 1000:.1f}'
+        )
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    # Faqat eng tashqi shablon o'lchanadi ({% include %} ichidagilar unga kiradi)
+    stats = getattr(_current, 'stats', None)
+    if stats is None or stats.rendering:
+        return _original_render(self, context)
+    stats.rendering = True
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template += time.perf_counter() - start
+        stats.rendering = False
+
+
+class RequestMetricsMiddleware:
+    """MIDDLEWARE da WhiteNoise'dan keyin, SessionMiddleware'dan oldin turishi kerak."""
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'QUIZ_METRICS_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        Template.render = _timed_render
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        _current.stats = stats
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.stats = None
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = stats.server_timing(total)
+        if request.resolver_match is not None:
+            record_sample(request.resolver_match.view_name, Sample(
+                total * 1000, stats.sql * 1000, stats.queries,
+                stats.template * 1000, stats.session * 1000, stats.slowest(),
+            ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Sessiya dangasa yuklanadi va SessionMiddleware javobda saqlaydi — ikkalasini o'raymiz
+        stats = getattr(_current, 'stats', None)
+        session = getattr(request, 'session', None)
+        if stats is not None and session is not None:
+            session.load = stats.timed(session.load, 'session')
+            session.save = stats.timed(session.save, 'session')
+
+
+def record_sample(view_name, sample):
+    with _samples_lock:
+        window = _samples.get(view_name)
+        if window is None:
+            window = _samples[view_name] = deque(maxlen=getattr(settings, 'QUIZ_METRICS_WINDOW', 500))
+        window.append(sample)
+
+
+def clear_metrics():
+    with _samples_lock:
+        _samples.clear()
+
+
+def percentile(values, p):
+    """Saralangan ro'yxatdan nearest-rank usulida p-persentil."""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(0, -(-p * len(values) // 100) - 1))]
+
+
+def metrics_summary():
+    """Har bir sahifa (URL nomi) uchun p50/p95/p99 va oynadagi eng sekin so'rov shakllari."""
+    with _samples_lock:
+        windows = {name: list(window) for name, window in _samples.items()}
+
+    summary = {}
+    for name, samples in sorted(windows.items()):
+        entry = {'requests': len(samples)}
+        for field in ('total', 'sql', 'queries', 'template', 'session'):
+            values = sorted(getattr(sample, field) for sample in samples)
+            key = field if field == 'queries' else f'{field}_ms'
+            entry[key] = {f'p{p}': round(percentile(values, p), 2) for p in PERCENTILES}
+
+        statements = {}
+        for sample in samples:
+            for fingerprint, ms in sample.slowest:
+                count, worst = statements.get(fingerprint, (0, 0))
+                statements[fingerprint] = (count + 1, max(worst, ms))
+        entry['slowest'] = [
+            {'sql': fingerprint, 'count': count, 'max_ms': round(worst, 2)}
+            for fingerprint, (count, worst) in sorted(statements.items(), key=lambda item: -item[1][1])[:10]
+        ]
+        summary[name] = entry
+    return summary
+
+
+class StackSampler(threading.Thread):
+    """Berilgan oqimning stekini vaqti-vaqti bilan o'qib, bir xil steklarni sanaydi."""
+
+    def __init__(self, thread_id, interval, stop_code=None):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        # Shu kod obyektidan yuqoridagi (handler/middleware) freymlar profilga kirmaydi
+        self.stop_code = stop_code
+        self.stacks = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame.f_code is not self.stop_code:
+                code = frame.f_code
+                names.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class RequestProfilerMiddleware:
+    """MIDDLEWARE oxirida turadi (superuser tekshiruvi uchun request.user kerak)."""
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'QUIZ_PROFILE_SAMPLE_RATE', 0)
+        header = getattr(settings, 'QUIZ_PROFILE_HEADER', '')
+        self.header = 'HTTP_' + header.upper().replace('-', '_') if header else None
+        if self.sample_rate <= 0 and self.header is None:
+            raise MiddlewareNotUsed
+        self.interval = getattr(settings, 'QUIZ_PROFILE_INTERVAL', 0.005)
+        self.get_response = get_response
+
+    def profile_reason(self, request):
+        from .models import RequestProfile
+
+        if self.header and request.META.get(self.header) and request.user.is_superuser:
+            return RequestProfile.REASON_HEADER
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return RequestProfile.REASON_SAMPLE
+        return None
+
+    def __call__(self, request):
+        reason = self.profile_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), self.interval, RequestProfilerMiddleware.__call__.__code__)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration = time.perf_counter() - start
+
+        profile = save_profile(request, reason, duration, sampler)
+        response['X-Profile-Id'] = str(profile.id)
+        return response
+
+
+def save_profile(request, reason, duration, sampler):
+    """Profilni yozadi va faqat oxirgi QUIZ_PROFILE_KEEP tasini qoldiradi."""
+    from .models import RequestProfile
+
+    match = request.resolver_match
+    profile = RequestProfile.objects.create(
+        path=request.path[:500],
+        view_name=match.view_name if match is not None else '',
+        user=request.user if request.user.is_authenticated else None,
+        reason=reason,
+        duration_ms=duration * 1000,
+        samples=sampler.samples,
+        stacks=sampler.collapsed(),
+    )
+    keep = getattr(settings, 'QUIZ_PROFILE_KEEP', 50)
+    oldest_kept = RequestProfile.objects.order_by('-id').values_list('id', flat=True)[keep - 1:keep]
+    RequestProfile.objects.filter(id__lt=oldest_kept).delete()
+    return profile
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+from quiz.utils import question_content_hash, question_text_hash
+
+
+def fill_hashes(apps, schema_editor):
+    """Mavjud savollar uchun xeshlar; bir turdagi takroriy savollarning faqat birinchisi content_hash oladi."""
+    Question = apps.get_model('quiz', 'Question')
+    Answer = apps.get_model('quiz', 'Answer')
+
+    answers = {}
+    for question_id, name in Answer.objects.values_list('question_id', 'name').iterator():
+        answers.setdefault(question_id, []).append(name)
+
+    seen = set()
+    batch = []
+    for question in Question.objects.order_by('id').only('id', 'quiz_type_id', 'name').iterator():
+        question.text_hash = question_text_hash(question.name)
+        content_hash = question_content_hash(question.name, answers.get(question.id, []))
+        key = (question.quiz_type_id, content_hash)
+        if key not in seen:
+            seen.add(key)
+            question.content_hash = content_hash
+        batch.append(question)
+    Question.objects.bulk_update(batch, ['content_hash', 'text_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='skipped_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('quiz_type', 'content_hash'), name='uniq_question_content_hash'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['quiz_type', 'text_hash'], name='question_type_text_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_correct_count(apps, schema_editor):
+    Question = apps.get_model('quiz', 'Question')
+    Answer = apps.get_model('quiz', 'Answer')
+    counts = (
+        Answer.objects.filter(question=OuterRef('pk'), is_correct=True)
+        .order_by()
+        .values('question')
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    Question.objects.update(correct_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_correct_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    """Mavjud "Test-YYYY-NNNNNN" raqamlaridan har yil uchun oxirgi qiymatni olamiz."""
+    GenerateQuiz = apps.get_model('quiz', 'GenerateQuiz')
+    QuizNumberCounter = apps.get_model('quiz', 'QuizNumberCounter')
+    last = {}
+    for numbers in GenerateQuiz.objects.values_list('numbers', flat=True).iterator():
+        parts = numbers.split('-')
+        if len(parts) != 3 or parts[0] != 'Test':
+            continue
+        try:
+            year, value = int(parts[1]), int(parts[2])
+        except ValueError:
+            continue
+        last[year] = max(last.get(year, 0), value)
+    QuizNumberCounter.objects.bulk_create(
+        [QuizNumberCounter(year=year, value=value) for year, value in last.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_question_correct_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizNumberCounter',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+def fill_positions(apps, schema_editor):
+    """Eski testlarda tartib sessiyada edi; u yaratilish tartibiga (id) mos keladi."""
+    GenerateQuizQuestion = apps.get_model('quiz', 'GenerateQuizQuestion')
+    batch = []
+    last_quiz, position = None, 0
+    for link in GenerateQuizQuestion.objects.order_by('quiz_id', 'id').only('id', 'quiz_id').iterator():
+        if link.quiz_id != last_quiz:
+            last_quiz, position = link.quiz_id, 0
+        link.position = position
+        position += 1
+        batch.append(link)
+        if len(batch) >= 1000:
+            GenerateQuizQuestion.objects.bulk_update(batch, ['position'])
+            batch = []
+    GenerateQuizQuestion.objects.bulk_update(batch, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_quiznumbercounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequizquestion',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+    ]
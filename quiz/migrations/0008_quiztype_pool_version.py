@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_generatequizquestion_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiztype',
+            name='pool_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
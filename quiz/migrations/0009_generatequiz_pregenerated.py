@@ -0,0 +1,47 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:52
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_question_count(apps, schema_editor):
+    GenerateQuiz = apps.get_model('quiz', 'GenerateQuiz')
+    GenerateQuizQuestion = apps.get_model('quiz', 'GenerateQuizQuestion')
+    counts = (
+        GenerateQuizQuestion.objects.filter(quiz=OuterRef('pk'))
+        .order_by()
+        .values('quiz')
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    GenerateQuiz.objects.update(question_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0008_quiztype_pool_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequiz',
+            name='pool_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='generatequiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='generatequiz',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quizzes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(fill_question_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_generatequiz_pregenerated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequiz',
+            name='seed',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatequiz',
+            name='shuffle_answers',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='QuestionPoolSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('ids', models.BinaryField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('quiz_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pool_snapshots', to='quiz.quiztype')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='questionpoolsnapshot',
+            constraint=models.UniqueConstraint(fields=('quiz_type', 'version'), name='uniq_pool_snapshot_version'),
+        ),
+    ]
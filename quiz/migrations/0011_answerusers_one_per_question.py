@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:57
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_answers(apps, schema_editor):
+    """Bir savolga bir nechta javob bo'lsa — eng oxirgi saqlangani qoladi."""
+    AnswerUsers = apps.get_model('quiz', 'AnswerUsers')
+    duplicates = (
+        AnswerUsers.objects.values('generate_quiz_id', 'question_id')
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for row in list(duplicates):
+        AnswerUsers.objects.filter(
+            generate_quiz_id=row['generate_quiz_id'], question_id=row['question_id']
+        ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_generatequiz_seed'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='answerusers',
+            unique_together=set(),
+        ),
+        migrations.RunPython(drop_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='answerusers',
+            constraint=models.UniqueConstraint(fields=('generate_quiz', 'question'), name='uniq_answer_per_question'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_answerusers_one_per_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answerusers',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
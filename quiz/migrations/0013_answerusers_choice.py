@@ -0,0 +1,53 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:59
+
+from django.db import migrations, models
+from django.db.models import Case, Count, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
+
+
+def recount_active_correct(apps, schema_editor):
+    # correct_count endi faqat faol to'g'ri javoblarni sanaydi
+    Question = apps.get_model('quiz', 'Question')
+    Answer = apps.get_model('quiz', 'Answer')
+    counts = (
+        Answer.objects.filter(question=OuterRef('pk'), is_correct=True, is_active=True)
+        .order_by()
+        .values('question')
+        .annotate(c=Count('id'))
+        .values('c')
+    )
+    correct = Coalesce(Subquery(counts), 0)
+    Question.objects.update(
+        correct_count=correct,
+        is_multiple_choice=Case(When(GreaterThan(correct, 1), then=Value(True)), default=Value(False)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_answerusers_answered_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='answerusers',
+            name='uniq_answer_per_question',
+        ),
+        migrations.AddField(
+            model_name='answerusers',
+            name='choice',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='answerusers',
+            name='selected',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddConstraint(
+            model_name='answerusers',
+            constraint=models.UniqueConstraint(fields=('generate_quiz', 'question', 'choice'), name='uniq_answer_choice'),
+        ),
+        migrations.RunPython(recount_active_correct, migrations.RunPython.noop),
+    ]
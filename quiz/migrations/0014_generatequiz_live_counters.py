@@ -0,0 +1,51 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counters(apps, schema_editor):
+    """Mavjud testlar uchun answered_count/correct_count (all_or_nothing siyosati bilan)."""
+    GenerateQuiz = apps.get_model('quiz', 'GenerateQuiz')
+    AnswerUsers = apps.get_model('quiz', 'AnswerUsers')
+    counters = {}
+    rows = (
+        AnswerUsers.objects.values('generate_quiz_id', 'question_id', 'question__correct_count')
+        .annotate(
+            chosen_correct=Count('id', filter=Q(answer__is_correct=True)),
+            chosen_wrong=Count('id', filter=Q(answer__is_correct=False)),
+        )
+        .order_by()
+    )
+    for row in rows.iterator():
+        answered, correct = counters.get(row['generate_quiz_id'], (0, 0))
+        correct_count = row['question__correct_count']
+        is_correct = correct_count > 0 and row['chosen_wrong'] == 0 and row['chosen_correct'] >= correct_count
+        counters[row['generate_quiz_id']] = (answered + 1, correct + is_correct)
+
+    quizzes = []
+    for quiz in GenerateQuiz.objects.filter(id__in=list(counters)).only('id'):
+        quiz.answered_count, quiz.correct_count = counters[quiz.id]
+        quizzes.append(quiz)
+    GenerateQuiz.objects.bulk_update(quizzes, ['answered_count', 'correct_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_answerusers_choice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequiz',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='generatequiz',
+            name='correct_count',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
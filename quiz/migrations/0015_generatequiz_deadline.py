@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:03
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_deadline(apps, schema_editor):
+    """Mavjud testlar: deadline = created + savollar soni (daqiqa)."""
+    GenerateQuiz = apps.get_model('quiz', 'GenerateQuiz')
+    batch = []
+    for quiz in GenerateQuiz.objects.filter(user__isnull=False).only('id', 'created', 'question_count').iterator():
+        quiz.deadline = quiz.created + timedelta(minutes=quiz.question_count)
+        batch.append(quiz)
+    GenerateQuiz.objects.bulk_update(batch, ['deadline'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_generatequiz_live_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequiz',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_deadline, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='generatequiz',
+            index=models.Index(condition=models.Q(('finished__isnull', True), ('user__isnull', False)), fields=['deadline'], name='quiz_open_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0015_generatequiz_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatequiz',
+            name='score_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_generatequiz_score_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatequiz',
+            index=models.Index(fields=['user', '-created', '-id'], name='quiz_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatequiz',
+            index=models.Index(fields=['user', 'quiz_type', '-created', '-id'], name='quiz_user_type_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0017_generatequiz_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'is_correct'], name='answer_question_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatequiz',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['quiz_type', 'question_count', 'pool_version'], name='quiz_unclaimed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['quiz_type', 'is_active', 'id'], name='question_type_active_idx'),
+        ),
+    ]
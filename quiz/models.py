@@ -1,27 +1,113 @@
-from datetime import datetime
-from django.db import models
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .utils import question_content_hash, question_text_hash, seeded_order
 
 
 # --- 1️⃣ Test turlari ---
 class QuizType(models.Model):
     name = models.CharField(max_length=200)
     is_active = models.BooleanField(default=True)
+    # Faol savollar to'plami o'zgarganda oshadi (quiz/pool.py keshini eskirtirish uchun)
+    pool_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # pool_version faqat bump_pool_version (atomar F() UPDATE) orqali o'zgaradi: oddiy saqlash
+        # (admin, tahrirlash formasi) eski qiymatni qayta yozib, parallel oshirishni bekor qilmasin
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'pool_version']
+        super().save(*args, **kwargs)
+
 
 # --- 2️⃣ Savollar ---
 class Question(models.Model):
     quiz_type = models.ForeignKey(QuizType, on_delete=models.CASCADE, related_name='questions')
     name = models.CharField(max_length=1000)
     is_active = models.BooleanField(default=True)
-    is_multiple_choice = models.BooleanField(default=False)
+    is_multiple_choice = models.BooleanField(default=False)  # correct_count > 1 dan kelib chiqadi
+    # FAOL to'g'ri javoblar soni (snapshotda ko'rinadiganlari) — Answer saqlanganda/o'chirilganda o'sib-kamayib boradi
+    correct_count = models.PositiveIntegerField(default=0, editable=False)
+    # Mazmun xeshi (savol matni + javoblar) — qayta importda dublikatlarni aniqlash uchun
+    content_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # Faqat savol matnining xeshi — qayta importda javoblari tahrirlangan savolni topish uchun
+    text_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz_type', 'content_hash'], name='uniq_question_content_hash'),
+        ]
+        indexes = [
+            # Faol savollar to'plami: filter(quiz_type, is_active=True).order_by('id')
+            models.Index(fields=['quiz_type', 'is_active', 'id'], name='question_type_active_idx'),
+            models.Index(fields=['quiz_type', 'text_hash'], name='question_type_text_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Savollar to'plamiga ta'sir qiladigan maydonlarni eslab qolamiz (quiz/signals.py)
+        if 'quiz_type_id' in field_names and 'is_active' in field_names:
+            instance._stored_pool_state = (instance.quiz_type_id, instance.is_active)
+        return instance
+
+    @staticmethod
+    def adjust_correct_count(question_id, delta):
+        """correct_count ni delta ga o'zgartiradi va is_multiple_choice ni shu UPDATE ichida yangilaydi."""
+        # UPDATE ichida correct_count eski qiymatni beradi: yangi > 1  <=>  eski > 1 - delta
+        Question.objects.filter(pk=question_id).update(
+            correct_count=F('correct_count') + delta,
+            is_multiple_choice=Case(When(correct_count__gt=1 - delta, then=Value(True)), default=Value(False)),
+        )
+
+    @staticmethod
+    def recount_correct(question_ids=None):
+        """correct_count va is_multiple_choice ni Answer jadvalidan bitta UPDATE bilan qayta hisoblaydi."""
+        counts = (
+            Answer.objects.filter(question=OuterRef('pk'), is_correct=True, is_active=True)
+            .order_by()
+            .values('question')
+            .annotate(c=Count('id'))
+            .values('c')
+        )
+        correct = Coalesce(Subquery(counts), 0)
+        questions = Question.objects.all()
+        if question_ids is not None:
+            questions = questions.filter(pk__in=question_ids)
+        return questions.update(
+            correct_count=correct,
+            is_multiple_choice=Case(When(GreaterThan(correct, 1), then=Value(True)), default=Value(False)),
+        )
+
+    def refresh_content_hash(self):
+        """Savol yoki javoblar tahrirlangandan keyin xeshni qayta hisoblaydi."""
+        content_hash = question_content_hash(self.name, self.answers.values_list('name', flat=True))
+        # Shu turda aynan shunday savol allaqachon bo'lsa, xesh bo'sh qoladi (unique buzilmasin)
+        duplicate = Question.objects.filter(
+            quiz_type_id=self.quiz_type_id, content_hash=content_hash
+        ).exclude(pk=self.pk).exists()
+        if duplicate:
+            content_hash = None
+        text_hash = question_text_hash(self.name)
+        if (content_hash, text_hash) != (self.content_hash, self.text_hash):
+            self.content_hash, self.text_hash = content_hash, text_hash
+            Question.objects.filter(pk=self.pk).update(content_hash=content_hash, text_hash=text_hash)
+
 
 
 
@@ -32,52 +118,249 @@ class Answer(models.Model):
     is_active = models.BooleanField(default=True)
     is_correct = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # To'g'ri javoblar: javob kaliti va correct_count qayta hisobi
+            models.Index(fields=['question', 'is_correct'], name='answer_question_correct_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bazadagi holatni eslab qolamiz: save()/delete() da correct_count ni farq bo'yicha yangilash uchun
+        if {'question_id', 'is_correct', 'is_active'} <= set(field_names):
+            instance._stored_correct = (instance.question_id, instance.counts_as_correct)
+        return instance
+
+    @property
+    def counts_as_correct(self):
+        # Nofaol javob testda ko'rinmaydi — correct_count ga ham kirmaydi
+        return self.is_correct and self.is_active
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)  # Javobni avval saqlaymiz
-        # Bog'langan savolning multiple_choice ni yangilaymiz
-        correct_count = Answer.objects.filter(question=self.question, is_correct=True).count()
-        is_multi = correct_count > 1
-        if self.question.is_multiple_choice != is_multi:
-            self.question.is_multiple_choice = is_multi
-            self.question.save(update_fields=['is_multiple_choice'])
+        # Bog'langan savolning correct_count (va is_multiple_choice) ni faqat o'zgarish bo'lsa yangilaymiz
+        old = getattr(self, '_stored_correct', (None, False))
+        new = (self.question_id, self.counts_as_correct)
+        self._stored_correct = new
+        if old[0] == new[0]:
+            _correct_changed(new[0], int(new[1]) - int(old[1]), self._cached_question())
+        else:
+            _correct_changed(old[0], -int(old[1]))
+            _correct_changed(new[0], int(new[1]), self._cached_question())
+
+    def delete(self, *args, **kwargs):
+        question_id, is_correct = getattr(self, '_stored_correct', (self.question_id, self.counts_as_correct))
+        question = self._cached_question()
+        result = super().delete(*args, **kwargs)
+        _correct_changed(question_id, -int(is_correct), question)
+        return result
+
+    def _cached_question(self):
+        # Xotiradagi Question nusxasi ham yangilansin (keyin u qayta save() qilinishi mumkin)
+        return self.question if Answer.question.is_cached(self) else None
 
 
+# Formset/admin bir nechta javobni ketma-ket saqlaganda har bir qator uchun UPDATE yubormaslik uchun:
+# batch_correct_count() ichida o'zgargan savollar yig'iladi va oxirida bitta UPDATE bilan qayta hisoblanadi.
+_correct_batch = threading.local()
+
+
+@contextmanager
+def batch_correct_count():
+    if getattr(_correct_batch, 'questions', None) is not None:
+        # Ichma-ich chaqiruv — tashqi blok hisoblaydi
+        yield
+        return
+    _correct_batch.questions = {}
+    try:
+        yield
+        questions = _correct_batch.questions
+    finally:
+        _correct_batch.questions = None
+    if not questions:
+        return
+    Question.recount_correct(list(questions))
+    # Xotiradagi nusxalarni ham yangilaymiz (bitta SELECT)
+    cached = {qid: objs for qid, objs in questions.items() if objs}
+    if cached:
+        rows = Question.objects.filter(pk__in=list(cached)).values_list('id', 'correct_count', 'is_multiple_choice')
+        for question_id, correct_count, is_multi in rows:
+            for question in cached[question_id]:
+                question.correct_count = correct_count
+                question.is_multiple_choice = is_multi
+
+
+def _correct_changed(question_id, delta, question=None):
+    if question_id is None or not delta:
+        return
+    pending = getattr(_correct_batch, 'questions', None)
+    if pending is not None:
+        objs = pending.setdefault(question_id, [])
+        if question is not None and not any(obj is question for obj in objs):
+            objs.append(question)
+        return
+    Question.adjust_correct_count(question_id, delta)
+    if question is not None:
+        question.correct_count += delta
+        question.is_multiple_choice = question.correct_count > 1
+
 
 # --- 4️⃣ Foydalanuvchi uchun yaratilgan test (har safar yangi test instance) ---
 class GenerateQuiz(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quizzes')
+    # user bo'sh bo'lsa — oldindan tayyorlangan, hali hech kim olmagan test (pregenerate_quizzes)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quizzes', null=True, blank=True)
     quiz_type = models.ForeignKey(QuizType, on_delete=models.CASCADE, related_name='generated_quizzes')
     score = models.IntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     finished = models.DateTimeField(null=True, blank=True)
     numbers = models.CharField(max_length=100, unique=True)
+    question_count = models.PositiveIntegerField(default=0)
+    # Savollar tanlangan paytdagi QuizType.pool_version
+    pool_version = models.PositiveIntegerField(default=0)
+    # seed bo'lsa — savollar GenerateQuizQuestion qatorlarisiz, (pool_version snapshoti + seed) dan tiklanadi
+    seed = models.BigIntegerField(null=True, blank=True)
+    shuffle_answers = models.BooleanField(default=False)
+    # Jonli hisoblagichlar: javob saqlanganda farq bilan yangilanadi (quiz/answers.py)
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.FloatField(default=0)  # partial siyosatda kasr bo'lishi mumkin
+    # Javoblar qabul qilinadigan oxirgi vaqt (server tomonida); o'tgach close_expired_quizzes yopadi
+    deadline = models.DateTimeField(null=True, blank=True)
+    # Qayta baholanganda oshadi: natija sahifasining keshi va ETag'i shu versiyaga bog'liq
+    score_version = models.PositiveIntegerField(default=0)
+
+    # Tarmoq kechikishi uchun: muddat tugagan zahoti yuborilgan javob ham qabul qilinsin
+    DEADLINE_GRACE = timedelta(seconds=30)
+
+    class Meta:
+        indexes = [
+            # Bosh sahifadagi tarix: foydalanuvchi testlari (created, id) bo'yicha kursor bilan
+            models.Index(fields=['user', '-created', '-id'], name='quiz_user_created_idx'),
+            models.Index(fields=['user', 'quiz_type', '-created', '-id'], name='quiz_user_type_created_idx'),
+            # Oldindan tayyorlangan (egasiz) testlarni olish: claim_pregenerated
+            models.Index(
+                fields=['quiz_type', 'question_count', 'pool_version'],
+                condition=Q(user__isnull=True),
+                name='quiz_unclaimed_idx',
+            ),
+            # Sweeper faqat tugatilmagan, egasi bor testlarni muddat bo'yicha qidiradi
+            models.Index(
+                fields=['deadline'],
+                condition=Q(finished__isnull=True, user__isnull=False),
+                name='quiz_open_deadline_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.numbers
 
+    def accepts_answers(self, now=None):
+        """Test hali tugatilmagan va muddati (DEADLINE_GRACE bilan) o'tmagan."""
+        if self.finished is not None:
+            return False
+        if self.deadline is None:
+            return True
+        return (now or timezone.now()) <= self.deadline + self.DEADLINE_GRACE
+
+    def question_ids(self):
+        """Testdagi savollar id'lari, test yaratilgandagi tartibda (ikkala saqlash usulida ham)."""
+        if self.seed is not None:
+            from .pool import expand_seed
+            return list(expand_seed(self.quiz_type_id, self.pool_version, self.seed, self.question_count))
+        # Tartib test yaratilgandan keyin o'zgarmaydi — bitta so'rov davomida bir marta o'qiladi
+        if not getattr(self, '_question_ids', None):
+            self._question_ids = list(self.questions.order_by('position').values_list('question_id', flat=True))
+        return list(self._question_ids)
+
+    def order_answers(self, question_id, answers):
+        """Javoblar tartibi: shuffle_answers bo'lsa — shu test va savol uchun doim bir xil aralashtirilgan."""
+        answers = list(answers)
+        if self.shuffle_answers and self.seed is not None:
+            answers = seeded_order(f"{self.seed}:{question_id}", answers, key=lambda answer: answer['id'])
+        return answers
+
     def save(self, *args, **kwargs):
         if not self.numbers:
-            year = datetime.now().year
-            last_quiz = GenerateQuiz.objects.filter(numbers__contains=f"Test-{year}-").order_by('-id').first()
-            last_num = 0
-            if last_quiz:
-                try:
-                    last_num = int(last_quiz.numbers.split('-')[-1])
-                except ValueError:
-                    pass
-            next_num = str(last_num + 1).zfill(6)
-            self.numbers = f"Test-{year}-{next_num}"
+            self.numbers = QuizNumberCounter.allocate()[0]
         super().save(*args, **kwargs)
 
 
+# --- Test raqamlari hisoblagichi: har yil uchun bitta qator ---
+class QuizNumberCounter(models.Model):
+    year = models.PositiveIntegerField(primary_key=True)
+    value = models.PositiveIntegerField(default=0)  # oxirgi berilgan raqam
+
+    def __str__(self):
+        return f"{self.year}: {self.value}"
+
+    @staticmethod
+    def format_number(year, value):
+        return f"Test-{year}-{str(value).zfill(6)}"
+
+    @classmethod
+    def allocate(cls, count=1, year=None):
+        """
+        `count` ta ketma-ket "Test-YYYY-NNNNNN" raqamini ajratadi (blok bilan olish ham mumkin).
+        Hisoblagich qatori atomar UPDATE bilan oshiriladi: LIKE qidiruvsiz, O(1) va
+        parallel so'rovlar bir xil raqam ololmaydi. Qator lock'i tranzaksiya oxirigacha turadi,
+        shuning uchun uzoq tranzaksiyalardan TASHQARIDA chaqirgan ma'qul.
+        """
+        year = year or timezone.localdate().year
+        with transaction.atomic():
+            if not cls.objects.filter(year=year).update(value=F('value') + count):
+                cls._create_for_year(year)
+                cls.objects.filter(year=year).update(value=F('value') + count)
+            last = cls.objects.filter(year=year).values_list('value', flat=True).get()
+        return [cls.format_number(year, value) for value in range(last - count + 1, last + 1)]
+
+    @classmethod
+    def _create_for_year(cls, year):
+        # Yangi yil: mavjud raqamlarning eng kattasidan davom etamiz (yiliga bir marta)
+        last_number = (
+            GenerateQuiz.objects.filter(numbers__startswith=f"Test-{year}-")
+            .order_by('-numbers')
+            .values_list('numbers', flat=True)
+            .first()
+        )
+        value = 0
+        if last_number:
+            try:
+                value = int(last_number.split('-')[-1])
+            except ValueError:
+                pass
+        try:
+            with transaction.atomic():
+                cls.objects.create(year=year, value=value)
+        except IntegrityError:
+            # Parallel so'rov allaqachon yaratgan
+            pass
+
+
+# --- Savollar to'plamining o'zgarmas nusxasi (seed rejimidagi testlar uchun) ---
+class QuestionPoolSnapshot(models.Model):
+    quiz_type = models.ForeignKey(QuizType, on_delete=models.CASCADE, related_name='pool_snapshots')
+    version = models.PositiveIntegerField()
+    # array('q') baytlari: faol savollar id'lari, id bo'yicha saralangan
+    ids = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz_type', 'version'], name='uniq_pool_snapshot_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz_type} v{self.version}"
+
+
 # --- 5️⃣ Har bir testdagi savollar (ko‘p savollik test uchun oraliq model) ---
 class GenerateQuizQuestion(models.Model):
     quiz = models.ForeignKey(GenerateQuiz, on_delete=models.CASCADE, related_name='questions')
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='quiz_links')
+    position = models.PositiveIntegerField(default=0)  # testdagi tartib raqami (0 dan)
 
     def __str__(self):
         return f"{self.quiz.numbers} - {self.question.name}"
@@ -89,9 +372,92 @@ class AnswerUsers(models.Model):
     generate_quiz = models.ForeignKey(GenerateQuiz, on_delete=models.CASCADE, related_name='user_answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='user_question_answers')
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='chosen_by_users')
+    # Javob tanlangan vaqt (brauzer vaqti): paket bilan kelganda eng oxirgi tanlov yutadi
+    answered_at = models.DateTimeField(null=True, blank=True)
+    # Bitta javobli savolda 0 (yangi tanlov eskisini almashtiradi),
+    # ko'p javobli savolda answer_id (har bir belgilangan javob — alohida qator)
+    choice = models.PositiveBigIntegerField(default=0)
+    # False — belgi olib tashlangan (ko'p javobli savol). Qator o'chirilmaydi: answered_at
+    # saqlanib qoladi va kechikib kelgan eski "belgilash" uni qayta tiklay olmaydi
+    selected = models.BooleanField(default=True)
 
     class Meta:
-        unique_together = ('user', 'generate_quiz', 'question', 'answer')
+        constraints = [
+            # save_answer shu kalit bo'yicha upsert qiladi
+            models.UniqueConstraint(fields=['generate_quiz', 'question', 'choice'], name='uniq_answer_choice'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} → {self.generate_quiz.numbers}"
+
+
+# --- 7️⃣ Word fayldan import vazifalari (fon rejimida ishlanadi) ---
+class ImportJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Navbatda'),
+        (STATUS_RUNNING, 'Bajarilmoqda'),
+        (STATUS_DONE, 'Tugadi'),
+        (STATUS_FAILED, 'Xatolik'),
+    )
+
+    quiz_type = models.ForeignKey(QuizType, on_delete=models.CASCADE, related_name='import_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    processed = models.PositiveIntegerField(default=0)      # ko'rib chiqilgan bloklar
+    created_count = models.PositiveIntegerField(default=0)  # yangi qo'shilgan savollar
+    updated_count = models.PositiveIntegerField(default=0)  # to'g'ri javoblari o'zgargan savollar
+    skipped_count = models.PositiveIntegerField(default=0)  # o'zgarmagan (dublikat) savollar
+    problems = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # Worker har batch'da yangilaydi; eskirgan 'running' vazifa qayta navbatga qo'yiladi (quiz/jobs.py)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.get_status_display()})"
+
+    def visible_to(self, user):
+        """Holatini (fayl natijalari va muammolar matni) faqat yuklagan foydalanuvchi va xodimlar ko'radi."""
+        return user.is_staff or (user.is_authenticated and self.created_by_id == user.id)
+
+
+# Yuklangan Word fayl bazada bo'laklab saqlanadi (worker alohida konteynerda ham o'qiydi); vazifa tugagach o'chiriladi
+class ImportJobChunk(models.Model):
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='uniq_import_chunk'),
+        ]
+
+
+# --- Profillangan so'rovlar (RequestProfilerMiddleware): oxirgi QUIZ_PROFILE_KEEP tasi saqlanadi ---
+class RequestProfile(models.Model):
+    REASON_SAMPLE = 'sample'
+    REASON_HEADER = 'header'
+    REASON_CHOICES = (
+        (REASON_SAMPLE, 'Tasodifiy tanlov'),
+        (REASON_HEADER, 'Sarlavha (superuser)'),
+    )
+
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES, default=REASON_SAMPLE)
+    duration_ms = models.FloatField(default=0)
+    samples = models.PositiveIntegerField(default=0)
+    # Flamegraph uchun "collapsed stacks": har qatorda "modul.funksiya;...;modul.funksiya soni"
+    stacks = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.view_name or self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,86 @@
+# quiz/pool.py
+"""
+Har bir QuizType uchun faol savollar id'lari keshi (jarayon ichida, ixcham array ko'rinishida).
+Kesh QuizType.pool_version bilan tekshiriladi: savol qo'shilsa/o'chirilsa/faolligi yoki turi
+o'zgarsa versiya oshadi (quiz/signals.py, bulk yo'llarda bump_pool_version), va keyingi
+so'rovda to'plam qayta o'qiladi. Test boshlashda Question jadvaliga murojaat qilinmaydi.
+"""
+from array import array
+from functools import lru_cache
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Question, QuestionPoolSnapshot, QuizType
+from .utils import seeded_order
+
+# quiz_type_id -> (pool_version, array('q', [question_id, ...]))
+_pools = {}
+# Snapshoti saqlangani tekshirilgan (quiz_type_id, pool_version) juftlari
+_snapshots_saved = set()
+
+
+def get_question_pool(quiz_type):
+    """QuizType'ning faol savollar id'lari (array, id bo'yicha saralangan)."""
+    cached = _pools.get(quiz_type.pk)
+    if cached is not None and cached[0] == quiz_type.pool_version:
+        return cached[1]
+
+    ids = array('q', Question.objects.filter(quiz_type_id=quiz_type.pk, is_active=True)
+                .order_by('id')
+                .values_list('id', flat=True))
+    _pools[quiz_type.pk] = (quiz_type.pool_version, ids)
+    return ids
+
+
+def bump_pool_version(quiz_type_ids):
+    """Berilgan turlarning savollar to'plami o'zgardi — barcha jarayonlardagi keshlar eskiradi."""
+    quiz_type_ids = {qt_id for qt_id in quiz_type_ids if qt_id is not None}
+    if quiz_type_ids:
+        QuizType.objects.filter(pk__in=quiz_type_ids).update(pool_version=F('pool_version') + 1)
+
+
+def clear_pools():
+    _pools.clear()
+    _snapshots_saved.clear()
+    load_snapshot.cache_clear()
+    expand_seed.cache_clear()
+
+
+def ensure_snapshot(quiz_type):
+    """
+    quiz_type.pool_version uchun o'zgarmas snapshot saqlanganiga ishonch hosil qiladi.
+    Seed rejimidagi testlar savollarni shu snapshotdan tiklaydi — to'plam keyin o'zgarsa ham
+    test tarkibi o'zgarmaydi. Har bir versiya uchun bir marta yoziladi.
+    """
+    key = (quiz_type.pk, quiz_type.pool_version)
+    if key in _snapshots_saved:
+        return
+    ids = get_question_pool(quiz_type)
+    if not QuestionPoolSnapshot.objects.filter(quiz_type_id=quiz_type.pk, version=quiz_type.pool_version).exists():
+        try:
+            with transaction.atomic():
+                QuestionPoolSnapshot.objects.create(
+                    quiz_type_id=quiz_type.pk, version=quiz_type.pool_version, ids=ids.tobytes(),
+                )
+        except IntegrityError:
+            # Parallel so'rov allaqachon yozgan — o'shanisi amal qiladi
+            pass
+    _snapshots_saved.add(key)
+
+
+@lru_cache(maxsize=32)
+def load_snapshot(quiz_type_id, version):
+    ids = array('q')
+    ids.frombytes(bytes(
+        QuestionPoolSnapshot.objects.filter(quiz_type_id=quiz_type_id, version=version)
+        .values_list('ids', flat=True).get()
+    ))
+    return ids
+
+
+@lru_cache(maxsize=1024)
+def expand_seed(quiz_type_id, version, seed, count):
+    """Seed'dan test savollarini tiklaydi: har doim (Python versiyasidan qat'i nazar) bir xil natija (tuple)."""
+    pool = load_snapshot(quiz_type_id, version)
+    return tuple(seeded_order(seed, pool, min(count, len(pool))))
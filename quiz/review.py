@@ -0,0 +1,79 @@
+# quiz/review.py
+"""
+Tugatilgan test natijasini ko'rib chiqish sahifasi.
+Savollar va javoblar bitta prefetch bilan guruhlanadi; tugatilgan test o'zgarmaydi, shuning uchun
+tayyor HTML bo'lagi keshda saqlanadi. Kalit score_version ni o'z ichiga oladi — test qayta
+baholansa (rescore_quizzes) versiya oshadi va eski nusxa o'z-o'zidan ishlatilmay qoladi.
+Shablon versiyasi va deploy versiyasi (settings.QUIZ_RELEASE) ham kalitda: sahifa ko'rinishi
+o'zgarsa eski HTML ham, brauzerdagi 304 ham qaytarilmaydi.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from .models import Answer, AnswerUsers, Question
+
+REVIEW_TIMEOUT = 7 * 24 * 60 * 60
+# result_users.html / result_review.html o'zgarganda oshiriladi
+REVIEW_TEMPLATE_VERSION = 1
+
+
+def review_version(quiz):
+    return f"{quiz.score_version}.{REVIEW_TEMPLATE_VERSION}.{settings.QUIZ_RELEASE}"
+
+
+def review_etag(quiz):
+    return f'"review-{quiz.id}-{review_version(quiz)}"'
+
+
+def review_cache_key(quiz):
+    return f"quiz_review:{quiz.id}:{review_version(quiz)}"
+
+
+def build_review(quiz):
+    """
+    Test savollari (test tartibida) va har biriga: javoblar, to'g'ri/tanlangan belgilari.
+    3 ta so'rov: foydalanuvchi tanlovlari, savollar, javoblar (prefetch).
+    """
+    chosen = {}
+    for question_id, answer_id in AnswerUsers.objects.filter(generate_quiz=quiz, selected=True).values_list('question_id', 'answer_id'):
+        chosen.setdefault(question_id, set()).add(answer_id)
+
+    question_ids = quiz.question_ids()
+    questions = Question.objects.filter(id__in=question_ids).prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.order_by('id').only('id', 'question_id', 'name', 'is_correct'))
+    ).only('id', 'name')
+    by_id = {q.id: q for q in questions}
+
+    review = []
+    for qid in question_ids:
+        question = by_id.get(qid)
+        if question is None:
+            continue
+        selected = chosen.get(qid, set())
+        review.append({
+            'name': question.name,
+            'answered': bool(selected),
+            'answers': [
+                {'name': a.name, 'is_correct': a.is_correct, 'chosen': a.id in selected}
+                for a in question.answers.all()
+            ],
+        })
+    return review
+
+
+def render_review(quiz):
+    """Natija bo'lagi (HTML). Tugatilgan testlar uchun keshdan."""
+    if quiz.accepts_answers():
+        # To'g'ri javoblar test davom etayotganda hech qachon ko'rsatilmaydi
+        raise ValueError("Test hali davom etmoqda")
+    if quiz.finished is None:
+        return render_to_string('quiz/result_review.html', {'quiz': quiz, 'review': build_review(quiz)})
+
+    key = review_cache_key(quiz)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('quiz/result_review.html', {'quiz': quiz, 'review': build_review(quiz)})
+        cache.set(key, html, REVIEW_TIMEOUT)
+    return html
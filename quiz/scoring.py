@@ -0,0 +1,153 @@
+# quiz/scoring.py
+"""
+Testlarni baholash: bitta guruhlangan so'rov — har bir (test, savol) uchun belgilangan
+to'g'ri/noto'g'ri javoblar soni va savolning to'g'ri javoblari soni (Question.correct_count).
+Qolgani Python'da yig'iladi; finish_quiz ham, rescore_quizzes buyrug'i ham shundan foydalanadi.
+
+Ko'p javobli savollar uchun siyosatlar:
+- all_or_nothing: barcha to'g'ri javoblar belgilangan va birorta noto'g'ri yo'q — 1 ball, aks holda 0;
+- partial: (to'g'ri belgilanganlar - noto'g'ri belgilanganlar) / to'g'ri javoblar soni, 0 dan kam emas.
+Bitta javobli savolda ikkala siyosat bir xil natija beradi.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import AnswerUsers, GenerateQuiz
+
+POLICY_ALL_OR_NOTHING = 'all_or_nothing'
+POLICY_PARTIAL = 'partial'
+POLICIES = (POLICY_ALL_OR_NOTHING, POLICY_PARTIAL)
+
+
+@dataclass
+class QuizScore:
+    correct: float = 0   # to'g'ri javoblar (partial siyosatda kasr bo'lishi mumkin)
+    answered: int = 0    # javob berilgan savollar
+    total: int = 0       # testdagi savollar
+
+    @property
+    def percent(self):
+        return score_percent(self.correct, self.total)
+
+
+def score_percent(correct, total):
+    """GenerateQuiz.score: to'g'ri javoblar foizi (butun son)."""
+    return int((correct / total) * 100) if total > 0 else 0
+
+
+def default_policy():
+    return getattr(settings, 'QUIZ_SCORING_POLICY', POLICY_ALL_OR_NOTHING)
+
+
+def question_credit(chosen_correct, chosen_wrong, correct_count, policy):
+    """Bitta savol uchun ball (0..1)."""
+    if correct_count <= 0:
+        return 0
+    if policy == POLICY_PARTIAL:
+        return max(0, min(chosen_correct, correct_count) - chosen_wrong) / correct_count
+    return 1 if chosen_wrong == 0 and chosen_correct >= correct_count else 0
+
+
+def score_quizzes(quizzes, policy=None):
+    """
+    Bir nechta testni bitta so'rov bilan baholaydi.
+    quizzes — GenerateQuiz obyektlari (total uchun question_count ishlatiladi).
+    Natija: {quiz_id: QuizScore}
+    """
+    policy = policy or default_policy()
+    if policy not in POLICIES:
+        raise ValueError(f"Noma'lum baholash siyosati: {policy}")
+
+    scores = {quiz.id: QuizScore(total=quiz.question_count) for quiz in quizzes}
+    if not scores:
+        return scores
+
+    rows = (
+        AnswerUsers.objects.filter(generate_quiz_id__in=list(scores), selected=True)
+        .values('generate_quiz_id', 'question_id', 'question__correct_count')
+        .annotate(
+            # Nofaol qilingan javob to'g'ri hisoblanmaydi (correct_count va javob kalitiga ham kirmaydi)
+            chosen_correct=Count('id', filter=Q(answer__is_correct=True, answer__is_active=True)),
+            chosen_wrong=Count('id', filter=Q(answer__is_correct=False) | Q(answer__is_active=False)),
+        )
+        .order_by()
+    )
+    for row in rows:
+        score = scores[row['generate_quiz_id']]
+        score.answered += 1
+        score.correct += question_credit(
+            row['chosen_correct'], row['chosen_wrong'], row['question__correct_count'], policy
+        )
+    for score in scores.values():
+        score.correct = round(score.correct, 2)
+    return scores
+
+
+def score_quiz(quiz, policy=None):
+    return score_quizzes([quiz], policy)[quiz.id]
+
+
+def rescore_quizzes(queryset, policy=None, chunk_size=500):
+    """
+    Tarixiy testlarni qayta baholaydi (score va jonli hisoblagichlar): id bo'yicha bo'laklab,
+    har bo'lakka bitta baholash so'rovi va bitta bulk_update. Bo'lak qatorlari tranzaksiya oxirigacha
+    qulflanadi — parallel saqlangan javobning hisoblagich farqi yo'qolmaydi. Natija: o'zgargan testlar soni.
+    """
+    changed = 0
+    last_id = 0
+    queryset = queryset.order_by('id').only(
+        'id', 'score', 'question_count', 'answered_count', 'correct_count', 'score_version',
+    )
+    while True:
+        with transaction.atomic():
+            quizzes = list(queryset.filter(id__gt=last_id).select_for_update()[:chunk_size])
+            if not quizzes:
+                break
+            last_id = quizzes[-1].id
+            scores = score_quizzes(quizzes, policy)
+            updated = []
+            for quiz in quizzes:
+                result = scores[quiz.id]
+                values = (result.percent, result.answered, result.correct)
+                if (quiz.score, quiz.answered_count, quiz.correct_count) != values:
+                    quiz.score, quiz.answered_count, quiz.correct_count = values
+                    quiz.score_version += 1  # natija sahifasi keshini eskirtiradi
+                    updated.append(quiz)
+            if updated:
+                GenerateQuiz.objects.bulk_update(updated, ['score', 'answered_count', 'correct_count', 'score_version'])
+                changed += len(updated)
+    return changed
+
+
+def close_expired_quizzes(now=None, policy=None, chunk_size=500):
+    """
+    Muddati (DEADLINE_GRACE bilan) o'tgan, tugatilmagan testlarni baholab yopadi.
+    Qidiruv quiz_open_deadline_idx qisman indeksi bo'yicha; har bo'lakka bitta baholash
+    so'rovi va bitta bulk_update. Tugash vaqti — testning muddati. Natija: yopilgan testlar soni.
+    Har bir bo'lak o'z tranzaksiyasida qulflanadi (SKIP LOCKED): shu payt javob saqlayotgan yoki
+    tugatilayotgan test o'tkazib yuboriladi va keyingi o'tishda qayta ko'riladi — uning natijasi
+    sweeper'ning eski bahosi bilan bosib ketilmaydi.
+    """
+    cutoff = (now or timezone.now()) - GenerateQuiz.DEADLINE_GRACE
+    expired = GenerateQuiz.objects.filter(
+        finished__isnull=True, user__isnull=False, deadline__lt=cutoff,
+    ).order_by('deadline').only('id', 'question_count', 'deadline')
+
+    closed = 0
+    while True:
+        with transaction.atomic():
+            quizzes = list(expired.select_for_update(skip_locked=True)[:chunk_size])
+            if not quizzes:
+                break
+            scores = score_quizzes(quizzes, policy)
+            for quiz in quizzes:
+                result = scores[quiz.id]
+                quiz.score, quiz.answered_count, quiz.correct_count = result.percent, result.answered, result.correct
+                quiz.finished = quiz.deadline
+            GenerateQuiz.objects.bulk_update(quizzes, ['score', 'answered_count', 'correct_count', 'finished'])
+        closed += len(quizzes)
+    return closed
@@ -0,0 +1,26 @@
+# quiz/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Question
+from .pool import bump_pool_version
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_stored_pool_state', (None, False))
+    new = (instance.quiz_type_id, instance.is_active)
+    instance._stored_pool_state = new
+    if old == new:
+        return
+    # Eski va yangi turdan faqat faol bo'lganlari to'plamga ta'sir qiladi
+    bump_pool_version({qt_id for qt_id, is_active in (old, new) if is_active})
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    quiz_type_id, is_active = getattr(instance, '_stored_pool_state', (instance.quiz_type_id, instance.is_active))
+    if is_active:
+        bump_pool_version([quiz_type_id])
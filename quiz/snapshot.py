@@ -0,0 +1,76 @@
+# quiz/snapshot.py
+"""
+Har bir test uchun o'zgarmas snapshot: savollar va ularning faol javoblari, test tartibida.
+Test yaratilganda bir marta quriladi va keshda (settings.CACHES) saqlanadi; quiz_page
+sahifa raqami bo'yicha ro'yxatdan to'g'ridan-to'g'ri oladi (Case/When tartiblash va Paginator COUNT'isiz).
+Keshdan tushib qolsa — birinchi so'rovda qayta quriladi. Kalitda QuizType.pool_version bor: savollar
+yoki ularning javoblari almashtirilsa versiya oshadi va har bir jarayon (kesh umumiy bo'lmasa ham)
+snapshotni qayta quradi — o'chirishni barcha jarayonlarga yetkazish shart emas. Sahifalar savollarning HOZIRGI
+is_active holatiga bog'liq emas: test davomida nofaol qilingan savol ham o'z sahifasida qoladi.
+Snapshotda to'g'ri javob belgilari YO'Q: u brauzerga ham yuborilishi mumkin.
+"""
+from django.core.cache import cache
+
+from .models import Answer, Question
+
+SNAPSHOT_TIMEOUT = 6 * 60 * 60  # test odatda bir necha soatda tugaydi
+
+
+def quiz_cache_version(quiz):
+    # quiz.quiz_type select_related bilan olinadi — alohida so'rov yo'q
+    return quiz.quiz_type.pool_version
+
+
+def snapshot_key(quiz):
+    return f"quiz_snapshot:{quiz.id}:{quiz_cache_version(quiz)}"
+
+
+def build_quiz_snapshot(quiz):
+    """
+    Snapshotni quradi va keshga yozadi (2 ta SELECT).
+    Natija: {
+        'question_count': testdagi savollar soni (nofaollari ham),
+        'questions': [{'id', 'name', 'multiple', 'answers': [{'id', 'name'}, ...]}, ...],  # test tartibida
+        'pages': {question_id: sahifa raqami (1 dan)},
+    }
+    """
+    question_ids = quiz.question_ids()
+    names, multiple = {}, set()
+    for qid, name, is_multiple_choice in Question.objects.filter(
+        id__in=question_ids
+    ).values_list('id', 'name', 'is_multiple_choice'):
+        names[qid] = name
+        if is_multiple_choice:
+            multiple.add(qid)
+    answers = {}
+    for answer_id, question_id, name in (
+        Answer.objects.filter(question_id__in=list(names), is_active=True)
+        .order_by('id')
+        .values_list('id', 'question_id', 'name')
+    ):
+        answers.setdefault(question_id, []).append({'id': answer_id, 'name': name})
+
+    questions = [
+        {
+            'id': qid,
+            'name': names[qid],
+            'multiple': qid in multiple,  # ko'p javobli: bir nechta variant belgilanadi
+            'answers': quiz.order_answers(qid, answers.get(qid, [])),
+        }
+        for qid in question_ids
+        if qid in names
+    ]
+    snapshot = {
+        'question_count': len(question_ids),
+        'questions': questions,
+        'pages': {q['id']: page for page, q in enumerate(questions, 1)},
+    }
+    cache.set(snapshot_key(quiz), snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def get_quiz_snapshot(quiz):
+    snapshot = cache.get(snapshot_key(quiz))
+    if snapshot is None:
+        snapshot = build_quiz_snapshot(quiz)
+    return snapshot
@@ -1,3 +1,1008 @@
-from django.test import TestCase
+import io
+import json
+import re
+import threading
+import time
+import tracemalloc
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .answers import answer_key_cache_key
+from .docx_stream import iter_docx_lines
+from .middleware import StackSampler, clear_metrics, sql_fingerprint
+from .models import (
+    Answer, AnswerUsers, GenerateQuiz, GenerateQuizQuestion, Question, QuizNumberCounter, QuizType, RequestProfile,
+)
+from .pool import bump_pool_version, clear_pools
+from .snapshot import snapshot_key
+from .utils import seeded_order
+
+# Test paytida katta bo'lib boradigan jadvallar — ularda to'liq skan bo'lmasligi kerak
+HOT_TABLES = ('quiz_answerusers', 'quiz_question', 'quiz_answer', 'quiz_generatequiz')
+
+
+def full_scans(sql):
+    """So'rov rejasidagi HOT_TABLES bo'yicha to'liq skanlar (indeksiz)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            pattern = r'Seq Scan on (\w+)'
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            # "SCAN table USING INDEX ..." — indeks bo'yicha, "SCAN table" — to'liq skan
+            pattern = r'\bSCAN (\w+)(?! USING)'
+    return [table for table in re.findall(pattern, plan) if table in HOT_TABLES]
+
+
+def seed_bank(quiz_type, count, answers=4):
+    """Savollar banki: har 5-savol ko'p javobli (2 ta to'g'ri javob), qolganlari bitta javobli."""
+    start = quiz_type.questions.count()
+    questions = Question.objects.bulk_create([
+        Question(quiz_type=quiz_type, name=f"{start + i + 1}. Savol") for i in range(count)
+    ])
+    Answer.objects.bulk_create([
+        Answer(question=question, name=f"Javob {j}", is_correct=(j == 0 or (j == 1 and i % 5 == 0)))
+        for i, question in enumerate(questions)
+        for j in range(answers)
+    ])
+    Question.recount_correct([question.id for question in questions])
+    bump_pool_version([quiz_type.id])
+    return questions
+
+
+def seed_history(user, quiz_type, count, answered=20):
+    """Tugatilgan testlar tarixi: har birida `answered` ta saqlangan javob."""
+    now = timezone.now()
+    quizzes = GenerateQuiz.objects.bulk_create([
+        GenerateQuiz(user=user, quiz_type=quiz_type, numbers=number, question_count=100,
+                     finished=now, deadline=now, answered_count=answered)
+        for number in QuizNumberCounter.allocate(count)
+    ])
+    question_ids = list(quiz_type.questions.order_by('id').values_list('id', flat=True)[:answered])
+    answers = dict(
+        Answer.objects.filter(question_id__in=question_ids, is_correct=True)
+        .order_by('-id').values_list('question_id', 'id')
+    ).items()
+    AnswerUsers.objects.bulk_create([
+        AnswerUsers(user=user, generate_quiz=quiz, question_id=question_id, answer_id=answer_id,
+                    choice=0, answered_at=now)
+        for quiz in quizzes
+        for question_id, answer_id in answers
+    ])
+    return quizzes
+
+
+class QueryPlanTests(TestCase):
+    """Asosiy sahifalar so'rovlari indekslardan foydalanadi (to'liq jadval skanisiz)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        for i in range(30):
+            question = Question.objects.create(quiz_type=cls.quiz_type, name=f"{i + 1}. Savol {i}")
+            for j in range(4):
+                Answer.objects.create(question=question, name=f"Javob {j}", is_correct=(j == 0))
+        cls.user = User.objects.create_user('student', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        clear_pools()
+        self.client.force_login(self.user)
+
+    def assertNoFullScans(self, queries):
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with self.subTest(sql=sql[:200]):
+                self.assertEqual(full_scans(sql), [])
+
+    def start_quiz(self, count=10):
+        self.client.get(reverse('start_quiz', args=[self.quiz_type.id]), {'count': count})
+        return GenerateQuiz.objects.filter(user=self.user).latest('id')
+
+    def save_answer(self, quiz, question_id):
+        answer = Answer.objects.filter(question_id=question_id, is_correct=True).first()
+        return self.client.post(
+            reverse('save_answer', args=[quiz.id]),
+            json.dumps({'question_id': question_id, 'answer_id': answer.id}),
+            content_type='application/json',
+        )
+
+    def test_start_quiz(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.start_quiz()
+        self.assertNoFullScans(ctx.captured_queries)
+
+    def test_quiz_page_and_payload(self):
+        quiz = self.start_quiz()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('quiz_page', args=[quiz.id, 1]))
+            self.client.get(reverse('quiz_payload', args=[quiz.id]))
+        self.assertNoFullScans(ctx.captured_queries)
+
+    def test_save_answers(self):
+        quiz = self.start_quiz()
+        question_ids = quiz.question_ids()
+        with CaptureQueriesContext(connection) as ctx:
+            self.save_answer(quiz, question_ids[0])
+            answer = Answer.objects.filter(question_id=question_ids[1]).first()
+            self.client.post(
+                reverse('save_answers', args=[quiz.id]),
+                json.dumps({'answers': [{'question_id': question_ids[1], 'answer_id': answer.id}]}),
+                content_type='application/json',
+            )
+        self.assertNoFullScans(ctx.captured_queries)
+
+    def test_finish_and_review(self):
+        quiz = self.start_quiz()
+        self.save_answer(quiz, quiz.question_ids()[0])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('finish_quiz', args=[quiz.id]))
+            self.client.get(reverse('result_users', args=[quiz.id]))
+        self.assertNoFullScans(ctx.captured_queries)
+
+    def test_home_history(self):
+        for _ in range(3):
+            self.start_quiz()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+            self.client.get(reverse('home'), {'quiz_type': self.quiz_type.id})
+        self.assertNoFullScans(ctx.captured_queries)
+
+    def test_close_expired_quizzes(self):
+        from .scoring import close_expired_quizzes
+
+        self.start_quiz()
+        with CaptureQueriesContext(connection) as ctx:
+            close_expired_quizzes()
+        self.assertNoFullScans(ctx.captured_queries)
+
+
+class ViewBudgetTests(TestCase):
+    """
+    Har bir sahifa uchun so'rovlar soni chegarasi va SQL vaqti byudjeti. So'rovlar soni
+    ma'lumot hajmiga bog'liq emas: kichik va katta bazada bir xil bo'lishi kerak.
+    Sozlamadagi (standart) kesh bilan o'lchanadi; DatabaseCacheBudgetTests — zaxira kesh bilan.
+    """
+
+    # Sahifa -> ruxsat etilgan eng ko'p so'rovlar soni (sessiya/foydalanuvchi so'rovlari bilan)
+    QUERY_BUDGETS = {
+        'generate_quiz': 16,
+        'quiz_page': 3,
+        'save_answer': 7,
+        'finish_quiz': 3,
+        'result_users': 6,
+        'home': 3,
+        'quiztype_list': 3,
+        'question_list': 4,
+    }
+    # Bitta sahifaning barcha SQL so'rovlari uchun jami vaqt (soniya)
+    SQL_TIME_BUDGET = 0.5
+    QUESTIONS = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        cls.user = User.objects.create_user('student', password='secret')
+        seed_bank(cls.quiz_type, cls.QUESTIONS)
+        seed_history(cls.user, cls.quiz_type, 3)
+
+    def grow(self):
+        """Katta baza: savollar banki, foydalanuvchining va boshqalarning uzun tarixi."""
+        seed_bank(self.quiz_type, 2000)
+        for i in range(3):
+            other_type = QuizType.objects.create(name=f"Fan {i}")
+            seed_bank(other_type, 500)
+        seed_history(self.user, self.quiz_type, 300)
+        seed_history(User.objects.create_user('other', password='secret'), self.quiz_type, 300)
+
+    def run_flow(self):
+        """100 savolli testni boshidan oxirigacha o'tadi: {sahifa: bajarilgan so'rovlar}."""
+        cache.clear()
+        clear_pools()
+        # Sessiya (cached_db) keshga yoziladi — odatdagi holat: so'rovlar django_session'ga tushmaydi
+        self.client.force_login(self.user)
+        captured = {}
+
+        def measure(name, method, url, *args, **kwargs):
+            with CaptureQueriesContext(connection) as ctx:
+                response = method(url, *args, **kwargs)
+            self.assertLess(response.status_code, 400, name)
+            captured[name] = ctx.captured_queries
+            return response
+
+        measure('generate_quiz', self.client.get, reverse('start_quiz', args=[self.quiz_type.id]),
+                {'count': self.QUESTIONS})
+        quiz = GenerateQuiz.objects.filter(user=self.user).latest('id')
+        question_ids = quiz.question_ids()
+        self.assertEqual(len(question_ids), self.QUESTIONS)
+        measure('quiz_page', self.client.get, reverse('quiz_page', args=[quiz.id, self.QUESTIONS // 2]))
+
+        correct = dict(
+            Answer.objects.filter(question_id__in=question_ids, is_correct=True)
+            .order_by('id').values_list('question_id', 'id')
+        )
+        for question_id in question_ids[:-1]:
+            self.client.post(
+                reverse('save_answer', args=[quiz.id]),
+                json.dumps({'question_id': question_id, 'answer_id': correct[question_id]}),
+                content_type='application/json',
+            )
+        measure('save_answer', self.client.post, reverse('save_answer', args=[quiz.id]),
+                json.dumps({'question_id': question_ids[-1], 'answer_id': correct[question_ids[-1]]}),
+                content_type='application/json')
+
+        measure('finish_quiz', self.client.get, reverse('finish_quiz', args=[quiz.id]))
+        measure('result_users', self.client.get, reverse('result_users', args=[quiz.id]))
+        measure('home', self.client.get, reverse('home'))
+        measure('quiztype_list', self.client.get, reverse('quiztype_list'))
+        measure('question_list', self.client.get, reverse('question_list'), {'page': 2})
+        return captured
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small = self.run_flow()
+        self.grow()
+        large = self.run_flow()
+        for name, budget in self.QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertEqual(len(large[name]), len(small[name]))
+                self.assertLessEqual(len(large[name]), budget)
+
+    def test_sql_time_budget(self):
+        self.grow()
+        for name, queries in self.run_flow().items():
+            with self.subTest(view=name):
+                self.assertLessEqual(sum(float(query['time']) for query in queries), self.SQL_TIME_BUDGET)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'quiz_cache_test',
+}})
+class DatabaseCacheBudgetTests(ViewBudgetTests):
+    """QUIZ_CACHE=db: har bir kesh o'qish/yozish ham SQL so'rov — byudjetlar shularni ham sanaydi."""
+
+    QUERY_BUDGETS = {
+        'generate_quiz': 28,
+        'quiz_page': 5,
+        'save_answer': 9,
+        'finish_quiz': 4,
+        'result_users': 13,
+        'home': 4,
+        'quiztype_list': 4,
+        'question_list': 5,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('createcachetable', verbosity=0)
+        super().setUpTestData()
+
+
+@override_settings(QUIZ_METRICS_SAMPLE_RATE=1)
+class RequestMetricsTests(TestCase):
+    """So'rovlar o'lchovi: Server-Timing sarlavhasi va superuser uchun persentillar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        seed_bank(cls.quiz_type, 20)
+        cls.user = User.objects.create_user('student', password='secret')
+        cls.admin = User.objects.create_superuser('admin', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        clear_pools()
+        clear_metrics()
+
+    def test_server_timing_and_percentiles(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('start_quiz', args=[self.quiz_type.id]), {'count': 10})
+        quiz = GenerateQuiz.objects.get(user=self.user)
+        for page in (1, 2, 3):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('quiz_page', args=[quiz.id, page]))
+            queries = len(ctx.captured_queries)
+            self.assertIn('sql;dur=', response['Server-Timing'])
+            self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+
+        self.client.force_login(self.admin)
+        metrics = self.client.get(reverse('request_metrics')).json()['views']['quiz_page']
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(set(metrics['total_ms']), {'p50', 'p95', 'p99'})
+        self.assertEqual(metrics['queries']['p99'], queries)
+        self.assertGreater(metrics['template_ms']['p50'], 0)
+        self.assertTrue(all('%s' not in item['sql'] for item in metrics['slowest']))
+
+    def test_metrics_are_superuser_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 403)
+
+    def test_disabled_when_sample_rate_is_zero(self):
+        with override_settings(QUIZ_METRICS_SAMPLE_RATE=0):
+            response = Client().get(reverse('login'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_sql_fingerprint(self):
+        self.assertEqual(
+            sql_fingerprint('SELECT "id" FROM "quiz_answer" WHERE "question_id" IN (%s, %s,\n %s) AND name = \'x\' LIMIT 21'),
+            'SELECT "id" FROM "quiz_answer" WHERE "question_id" IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(
+            sql_fingerprint('INSERT INTO "quiz_answerusers" ("a", "b") VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO "quiz_answerusers" ("a", "b") VALUES (...)',
+        )
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@override_settings(QUIZ_PROFILE_SAMPLE_RATE=0, QUIZ_PROFILE_HEADER='X-Profile', QUIZ_PROFILE_KEEP=2)
+class RequestProfilerTests(TestCase):
+    """So'rov profili: faqat superuser sarlavhasi bilan, oxirgi N tasi saqlanadi."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student', password='secret')
+        cls.admin = User.objects.create_superuser('admin', password='secret')
+
+    def test_sampler_collects_collapsed_stacks(self):
+        sampler = StackSampler(threading.get_ident(), 0.001)
+        sampler.start()
+        busy_loop(0.1)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        lines = sampler.collapsed().splitlines()
+        self.assertTrue(all(re.fullmatch(r'\S+ \d+', line) for line in lines))
+        self.assertIn('quiz.tests.busy_loop', sampler.collapsed())
+
+    def test_header_profiles_only_for_superuser(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            response = self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get(id=response['X-Profile-Id'])
+        self.assertEqual((profile.view_name, profile.reason), ('home', RequestProfile.REASON_HEADER))
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+        download = self.client.get(reverse('admin:quiz_requestprofile_download', args=[profile.id]))
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="profile-{profile.id}.collapsed"')
+
+
+class QuizAttemptTests(TestCase):
+    """Test davomidagi himoyalar: natija sahifasi va javoblarni saqlash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        seed_bank(cls.quiz_type, 20)
+        cls.user = User.objects.create_user('student', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        clear_pools()
+        self.client.force_login(self.user)
+        self.client.get(reverse('start_quiz', args=[self.quiz_type.id]), {'count': 20})
+        self.quiz = GenerateQuiz.objects.get(user=self.user)
+
+    def save(self, *answers, client_ts=None):
+        """answers: (question_id, answer_id, selected) — bitta save_answers paketi."""
+        return self.client.post(
+            reverse('save_answers', args=[self.quiz.id]),
+            json.dumps({'answers': [
+                {'question_id': q_id, 'answer_id': a_id, 'selected': selected, 'client_ts': client_ts}
+                for q_id, a_id, selected in answers
+            ]}),
+            content_type='application/json',
+        )
+
+    def assertCountersMatchScore(self):
+        from .scoring import score_quiz
+
+        self.quiz.refresh_from_db()
+        score = score_quiz(self.quiz)
+        self.assertEqual((self.quiz.answered_count, self.quiz.correct_count), (score.answered, score.correct))
+
+    def test_review_is_hidden_during_attempt(self):
+        response = self.client.get(reverse('result_users', args=[self.quiz.id]))
+        self.assertRedirects(response, reverse('quiz_app', args=[self.quiz.id]))
+
+        self.client.get(reverse('finish_quiz', args=[self.quiz.id]))
+        response = self.client.get(reverse('result_users', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_review_etag_matches_exactly_and_follows_release(self):
+        self.client.get(reverse('finish_quiz', args=[self.quiz.id]))
+        url = reverse('result_users', args=[self.quiz.id])
+        etag = self.client.get(url)['ETag']
+
+        for header, status in (
+            (etag, 304),
+            (f'"other", W/{etag}', 304),
+            ('*', 304),
+            (etag[:-2] + '"', 200),  # prefiks — mos emas
+            (f'"x{etag[1:]}', 200),
+        ):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=header).status_code, status, header)
+
+        with override_settings(QUIZ_RELEASE='next'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_deactivated_correct_answer_is_not_required(self):
+        from .scoring import POLICY_ALL_OR_NOTHING, POLICY_PARTIAL, score_quiz
+
+        multi = Question.objects.filter(quiz_type=self.quiz_type, is_multiple_choice=True).first()
+        first, second = multi.answers.filter(is_correct=True).order_by('id')[:2]
+        second.is_active = False
+        second.save()
+        multi.refresh_from_db()
+        self.assertEqual((multi.correct_count, multi.is_multiple_choice), (1, False))
+
+        self.save((multi.id, first.id, True))
+        for policy in (POLICY_ALL_OR_NOTHING, POLICY_PARTIAL):
+            self.assertEqual(score_quiz(self.quiz, policy).correct, 1)
+
+    def test_counters_after_repeated_and_overlapping_saves(self):
+        from .answers import record_answers
+
+        multi = Question.objects.filter(quiz_type=self.quiz_type, is_multiple_choice=True).first()
+        single = Question.objects.filter(quiz_type=self.quiz_type, is_multiple_choice=False).first()
+        multi_correct = list(multi.answers.filter(is_correct=True).values_list('id', flat=True))
+        single_correct = single.answers.get(is_correct=True).id
+
+        # Ikki marta bosish va bir-birini qoplagan paketlar
+        for _ in range(3):
+            self.save((single.id, single_correct, True))
+        self.save((single.id, single_correct, True), (multi.id, multi_correct[0], True))
+        self.save((multi.id, multi_correct[1], True), (multi.id, multi_correct[0], True))
+        # Bir vaqtda kelgan ikkita saqlash — ikkalasi ham "yozuv yo'q" holatini ko'rgan
+        now = timezone.now()
+        other = Question.objects.filter(quiz_type=self.quiz_type, is_multiple_choice=False).exclude(id=single.id).first()
+        other_correct = other.answers.get(is_correct=True).id
+        for _ in range(2):
+            record_answers(self.quiz, self.user, {(other.id, 0): (now, other_correct, True)})
+
+        self.assertCountersMatchScore()
+        self.assertEqual((self.quiz.answered_count, self.quiz.correct_count), (3, 3))
+
+    def test_snapshot_pages_survive_deactivation_and_eviction(self):
+        from .snapshot import get_quiz_snapshot
+
+        pages = get_quiz_snapshot(self.quiz)['pages']
+        question = Question.objects.get(id=self.quiz.question_ids()[0])
+        question.is_active = False
+        question.save()
+        cache.clear()
+        self.assertEqual(get_quiz_snapshot(self.quiz)['pages'], pages)
+
+    def test_quiz_type_save_keeps_concurrent_pool_bump(self):
+        quiz_type = QuizType.objects.get(id=self.quiz_type.id)
+        version = quiz_type.pool_version
+        bump_pool_version([quiz_type.id])  # masalan, parallel import vazifasi
+        quiz_type.name = 'Algebra'
+        quiz_type.save()
+        quiz_type.refresh_from_db()
+        self.assertEqual((quiz_type.name, quiz_type.pool_version), ('Algebra', version + 1))
+
+    def test_invalid_items_do_not_drop_the_batch(self):
+        question_id = self.quiz.question_ids()[0]
+        answer_id = Answer.objects.filter(question_id=question_id, is_correct=True).values_list('id', flat=True).first()
+        outsider = Question.objects.create(quiz_type=self.quiz_type, name='Testda yo\'q savol')
+        response = self.save((outsider.id, 0, True), (question_id, answer_id, True))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['applied'], 1)
+        self.assertEqual(response.json()['rejected'], [{'question_id': outsider.id, 'answer_id': 0}])
+        self.assertCountersMatchScore()
+
+    def test_malformed_batch_is_rejected_with_400(self):
+        question_id = self.quiz.question_ids()[0]
+        answer_id = Answer.objects.filter(question_id=question_id).values_list('id', flat=True).first()
+        url = reverse('save_answers', args=[self.quiz.id])
+        for answers in (
+            [{'question_id': question_id, 'answer_id': answer_id}, 'x', 5, None, [question_id, answer_id]],
+            {'question_id': question_id, 'answer_id': answer_id},
+        ):
+            response = self.client.post(url, json.dumps({'answers': answers}), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(AnswerUsers.objects.filter(generate_quiz=self.quiz).exists())
+
+    def test_delayed_tick_does_not_undo_newer_untick(self):
+        multi = Question.objects.filter(quiz_type=self.quiz_type, is_multiple_choice=True).first()
+        answer_id = multi.answers.filter(is_correct=True).values_list('id', flat=True).first()
+        start = int(timezone.now().timestamp() * 1000) - 10000
+
+        self.save((multi.id, answer_id, True), client_ts=start)
+        self.save((multi.id, answer_id, False), client_ts=start + 2000)
+        # Tarmoqda kechikkan, belgilashdan keyin, lekin olib tashlashdan oldin yuborilgan paket
+        self.save((multi.id, answer_id, True), client_ts=start + 1000)
+
+        self.assertFalse(AnswerUsers.objects.get(generate_quiz=self.quiz, question=multi).selected)
+        self.assertCountersMatchScore()
+        self.assertEqual(self.quiz.answered_count, 0)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSaveTests(TransactionTestCase):
+    """Parallel saqlashlar (alohida ulanishlarda) hisoblagichlarni ikki marta oshirmaydi."""
+
+    def test_parallel_first_answers(self):
+        from .answers import record_answers
+        from .generation import create_quiz
+
+        quiz_type = QuizType.objects.create(name='Matematika')
+        question = seed_bank(quiz_type, 1)[0]
+        correct = question.answers.get(is_correct=True).id
+        user = User.objects.create_user('student', password='secret')
+        quiz = create_quiz(user, quiz_type, [question.id])
+        barrier = threading.Barrier(4)
+
+        def save():
+            try:
+                barrier.wait()
+                record_answers(quiz, user, {(question.id, 0): (timezone.now(), correct, True)})
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        quiz.refresh_from_db()
+        self.assertEqual((quiz.answered_count, quiz.correct_count), (1, 1))
+
+
+class QuizNumberCounterTests(TestCase):
+    """Test raqamlari: blok bilan ajratish va yangi yil hisoblagichini mavjud raqamlardan boshlash."""
+
+    def test_block_allocation_is_consecutive(self):
+        self.assertEqual(QuizNumberCounter.allocate(3, year=2030),
+                         ['Test-2030-000001', 'Test-2030-000002', 'Test-2030-000003'])
+        self.assertEqual(QuizNumberCounter.allocate(year=2030), ['Test-2030-000004'])
+        self.assertEqual(QuizNumberCounter.objects.get(year=2030).value, 4)
+
+    def test_new_year_continues_from_existing_numbers(self):
+        quiz_type = QuizType.objects.create(name='Matematika')
+        user = User.objects.create_user('student', password='secret')
+        GenerateQuiz.objects.bulk_create([
+            GenerateQuiz(user=user, quiz_type=quiz_type, numbers=number)
+            for number in ('Test-2031-000041', 'Test-2031-000007', 'Test-2032-000099')
+        ])
+        self.assertEqual(QuizNumberCounter.allocate(2, year=2031), ['Test-2031-000042', 'Test-2031-000043'])
+        # Boshqa yil raqamlari aralashmaydi; qator bor bo'lsa qayta qidirilmaydi
+        self.assertEqual(QuizNumberCounter.allocate(year=2033), ['Test-2033-000001'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(QuizNumberCounter.allocate(year=2031), ['Test-2031-000044'])
+        self.assertFalse([q for q in ctx.captured_queries if 'quiz_generatequiz' in q['sql']])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentNumberTests(TransactionTestCase):
+    """Yangi yilning birinchi testlari parallel boshlansa ham raqamlar takrorlanmaydi."""
+
+    def test_parallel_allocations(self):
+        barrier = threading.Barrier(4)
+        numbers = []
+
+        def allocate():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    numbers.extend(QuizNumberCounter.allocate(2, year=2034))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(numbers), [QuizNumberCounter.format_number(2034, i) for i in range(1, 41)])
+
+
+class PregeneratedClaimTests(TestCase):
+    """Oldindan tayyorlangan testlar: eskirgani berilmaydi, bitta test ikki foydalanuvchiga tushmaydi."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        seed_bank(cls.quiz_type, 20)
+        cls.users = [User.objects.create_user(f'student{i}', password='secret') for i in range(2)]
+
+    def setUp(self):
+        from .generation import pregenerate_quizzes
+
+        clear_pools()
+        self.quiz_type.refresh_from_db()
+        pregenerate_quizzes(self.quiz_type, 10, 2)
+
+    def claim(self, user):
+        from .generation import claim_pregenerated
+
+        return claim_pregenerated(user, self.quiz_type, 10)
+
+    def test_stale_pool_or_other_size_is_not_claimed(self):
+        from .generation import claim_pregenerated
+
+        self.assertIsNone(claim_pregenerated(self.users[0], self.quiz_type, 5))
+        bump_pool_version([self.quiz_type.id])
+        self.quiz_type.refresh_from_db()
+        self.assertIsNone(self.claim(self.users[0]))
+        self.assertEqual(GenerateQuiz.objects.filter(user__isnull=True).count(), 2)
+
+    def test_two_claimants_never_share_a_quiz(self):
+        claimed = [self.claim(self.users[0]), self.claim(self.users[1])]
+        self.assertEqual(len(set(claimed)), 2)
+        self.assertIsNone(self.claim(self.users[0]))
+
+        # Ikkinchi foydalanuvchi nomzodni birinchisi UPDATE qilishidan oldin olib qo'ydi
+        GenerateQuiz.objects.filter(id__in=claimed).update(user=None)
+
+        def taken_by_other(candidates):
+            GenerateQuiz.objects.filter(id__in=candidates).update(user=self.users[1])
+
+        with mock.patch('quiz.generation.random.shuffle', taken_by_other):
+            self.assertIsNone(self.claim(self.users[0]))
+        self.assertEqual(set(GenerateQuiz.objects.filter(id__in=claimed).values_list('user', flat=True)),
+                         {self.users[1].id})
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentClaimTests(TransactionTestCase):
+    """Parallel olishlar (alohida ulanishlarda): har bir tayyor test faqat bitta foydalanuvchiga."""
+
+    def test_parallel_claims(self):
+        from .generation import claim_pregenerated, pregenerate_quizzes
+
+        quiz_type = QuizType.objects.create(name='Matematika')
+        seed_bank(quiz_type, 20)
+        quiz_type.refresh_from_db()
+        pregenerate_quizzes(quiz_type, 10, 3)
+        users = [User.objects.create_user(f'student{i}', password='secret') for i in range(6)]
+        barrier = threading.Barrier(len(users))
+        claimed = []
+
+        def claim(user):
+            try:
+                barrier.wait()
+                claimed.append(claim_pregenerated(user, quiz_type, 10))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=[user]) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        won = [quiz_id for quiz_id in claimed if quiz_id is not None]
+        self.assertEqual(len(won), len(set(won)))
+        self.assertEqual(len(won), 3)
+        self.assertFalse(GenerateQuiz.objects.filter(user__isnull=True).exists())
+
+
+class DocxStreamTests(TestCase):
+    """Bitta katta jadvaldan iborat hujjat ham oqim bilan, o'zgarmas xotirada o'qiladi."""
+
+    def make_docx(self, rows):
+        w = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+        body = ''.join(
+            f'<w:tr><w:tc><w:p><w:r><w:t>{i}. Savol</w:t></w:r></w:p>'
+            f'<w:p><w:r><w:t>*Javob</w:t></w:r></w:p></w:tc></w:tr>'
+            for i in range(1, rows + 1)
+        )
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('word/document.xml', f'<w:document xmlns:w="{w}"><w:body><w:tbl>{body}</w:tbl></w:body></w:document>')
+        buffer.seek(0)
+        return buffer
+
+    def test_single_table_memory(self):
+        small, large = self.make_docx(1000), self.make_docx(20000)
+        peaks = []
+        for file, rows in ((small, 1000), (large, 20000)):
+            tracemalloc.start()
+            lines = sum(1 for _ in iter_docx_lines(file))
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(lines, rows)
+        self.assertLess(peaks[1], peaks[0] * 2)
+
+
+class SeededOrderTests(TestCase):
+    """Saqlangan seed'lar istalgan Python versiyasida aynan shu natijaga yoyilishi shart."""
+
+    def test_known_expansions(self):
+        self.assertEqual(seeded_order(12345, range(1, 101), 10), [50, 100, 3, 92, 31, 15, 40, 53, 5, 41])
+        self.assertEqual(seeded_order('12345:7', [{'id': i} for i in (1, 2, 3, 4)], key=lambda a: a['id']),
+                         [{'id': 4}, {'id': 2}, {'id': 1}, {'id': 3}])
+
+
+class CorrectCountTests(TestCase):
+    """Answer.save()/delete() dagi farq (delta) hisobi har doim yangi COUNT bilan mos keladi."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.quiz_type = QuizType.objects.create(name='Matematika')
+        cls.multi, cls.single = Question.objects.bulk_create([
+            Question(quiz_type=cls.quiz_type, name=f"{i}. Savol") for i in (1, 2)
+        ])
+        # Ko'p javobli savolda 2 ta, bitta javoblida 1 ta to'g'ri javob
+        Answer.objects.bulk_create([
+            Answer(question=question, name=f"Javob {j}", is_correct=j < correct)
+            for question, correct in ((cls.multi, 2), (cls.single, 1))
+            for j in range(4)
+        ])
+        Question.recount_correct([cls.multi.id, cls.single.id])
+
+    def assertCountsFresh(self, *questions):
+        for question in questions:
+            fresh = Answer.objects.filter(question=question, is_correct=True, is_active=True).count()
+            stored = Question.objects.values_list('correct_count', 'is_multiple_choice').get(pk=question.pk)
+            self.assertEqual(stored, (fresh, fresh > 1), question.name)
+
+    def test_toggle_correct(self):
+        question = Question.objects.get(pk=self.single.pk)
+        answer = question.answers.filter(is_correct=False).first()  # question keshda — xotiradagi nusxa ham yangilanadi
+
+        answer.is_correct = True
+        answer.save()
+        self.assertCountsFresh(question)
+        self.assertEqual((question.correct_count, question.is_multiple_choice), (2, True))
+        answer.save()  # o'zgarishsiz saqlash ikki marta sanamaydi
+        self.assertCountsFresh(question)
+
+        answer.is_correct = False
+        answer.save()
+        self.assertCountsFresh(question)
+        self.assertEqual((question.correct_count, question.is_multiple_choice), (1, False))
+
+        Answer.objects.create(question=question, name='Yangi', is_correct=True)
+        self.assertCountsFresh(question)
+
+    def test_toggle_active(self):
+        question = Question.objects.get(pk=self.multi.pk)
+        answer = question.answers.filter(is_correct=True).first()
+
+        answer.is_active = False
+        answer.save()
+        self.assertCountsFresh(question)
+        self.assertEqual((question.correct_count, question.is_multiple_choice), (1, False))
+        answer.is_correct = False
+        answer.is_active = True
+        answer.save()
+        self.assertCountsFresh(question)
+        answer.is_correct = True
+        answer.save()
+        self.assertCountsFresh(question)
+        self.assertEqual((question.correct_count, question.is_multiple_choice), (2, True))
+
+    def test_move_answer_between_questions(self):
+        answer = Answer.objects.get(question=self.multi, name='Javob 1')
+        answer.question = self.single
+        answer.save()
+        self.assertCountsFresh(self.single, self.multi)
+
+        answer.question_id = self.multi.id
+        answer.is_correct = False
+        answer.save()
+        self.assertCountsFresh(self.single, self.multi)
+
+    def test_delete(self):
+        for answer in Answer.objects.filter(question=self.multi).order_by('-is_correct'):
+            answer.delete()
+            self.assertCountsFresh(self.multi)
+        # Maydonlari to'liq yuklanmagan nusxa ham to'g'ri ayiriladi
+        Answer.objects.only('id', 'question_id').get(question=self.single, is_correct=True).delete()
+        self.assertCountsFresh(self.single)
+
+    def test_formset_batch_recounts_once(self):
+        from .forms import AnswerUpdateFormSet
+        from .models import batch_correct_count
+
+        question = Question.objects.get(pk=self.multi.pk)
+        answers = list(question.answers.order_by('id'))
+        data = {
+            'answers-TOTAL_FORMS': str(len(answers) + 1), 'answers-INITIAL_FORMS': str(len(answers)),
+            'answers-MIN_NUM_FORMS': '0', 'answers-MAX_NUM_FORMS': '20',
+        }
+        # 0 — to'g'ri qoladi, 1 — o'chiriladi, 2 — to'g'ri bo'ladi, 3 — nofaol, yangi — to'g'ri
+        rows = [(True, True, False), (True, True, True), (True, True, False), (False, False, False)]
+        for i, (answer, (correct, active, delete)) in enumerate(zip(answers, rows)):
+            data.update({f'answers-{i}-id': str(answer.id), f'answers-{i}-name': answer.name})
+            data.update({key: 'on' for key, on in (
+                (f'answers-{i}-is_correct', correct), (f'answers-{i}-is_active', active), (f'answers-{i}-DELETE', delete),
+            ) if on})
+        i = len(answers)
+        data.update({f'answers-{i}-name': 'Yangi', f'answers-{i}-is_correct': 'on', f'answers-{i}-is_active': 'on'})
+
+        formset = AnswerUpdateFormSet(data, instance=question)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with CaptureQueriesContext(connection) as ctx, batch_correct_count():
+            with batch_correct_count():  # ichma-ich blok hisoblamaydi
+                formset.save()
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "quiz_question"')]
+        self.assertEqual(len(updates), 1)
+        self.assertCountsFresh(question)
+        self.assertEqual(question.correct_count, 3)
+
+
+class ImporterTests(TestCase):
+    """Qayta yuklash: javob matni tuzatilgan savol yangilanadi, dublikat qo'shilmaydi."""
+
+    def test_reupload_updates_changed_answer_set(self):
+        from .importer import import_question_blocks
+
+        quiz_type = QuizType.objects.create(name='Matematika')
+        import_question_blocks(quiz_type, [
+            ('1. 2 + 2 = ?', ['*4', '5', '22']),
+            ('2. Umumiy savol', ['A', '*B']),
+        ])
+        question = Question.objects.get(quiz_type=quiz_type, name__endswith='2 + 2 = ?')
+        old = {a.name: a.id for a in question.answers.all()}
+
+        stats, _ = import_question_blocks(quiz_type, [
+            ('7. 2 + 2 = ?', ['4', '*to\'rt', '5']),
+            ('2. Umumiy savol', ['A', '*B']),
+        ])
+        self.assertEqual(stats, {'inserted': 0, 'updated': 1, 'skipped': 1})
+        self.assertEqual(Question.objects.filter(quiz_type=quiz_type).count(), 2)
+        question.refresh_from_db()
+        self.assertEqual(question.name, '7. 2 + 2 = ?')
+        active = dict(question.answers.filter(is_active=True).values_list('name', 'is_correct'))
+        self.assertEqual(active, {'4': False, "to'rt": True, '5': False})
+        # Eski javob qatorlari tahrirlanmaydi (tarixdagi tanlovlar shularga bog'langan) — faqat nofaol bo'ladi
+        self.assertEqual(
+            set(question.answers.filter(id__in=old.values()).values_list('name', 'is_correct', 'is_active')),
+            {('4', True, False), ('5', False, True), ('22', False, False)},
+        )
+
+    def test_reupload_refreshes_open_attempts(self):
+        from .importer import import_question_blocks
+
+        quiz_type = QuizType.objects.create(name='Matematika')
+        import_question_blocks(quiz_type, [('1. 2 + 2 = ?', ['*4', '5', '22'])])
+        question = Question.objects.get(quiz_type=quiz_type)
+        user = User.objects.create_user('talaba', password='x')
+        quiz = GenerateQuiz.objects.create(user=user, quiz_type=quiz_type, question_count=1)
+        GenerateQuizQuestion.objects.create(quiz=quiz, question=question)
+        AnswerUsers.objects.create(user=user, generate_quiz=quiz, question=question,
+                                   answer=question.answers.get(name='4'))
+        cache.set(snapshot_key(quiz), 'eski')
+        cache.set(answer_key_cache_key(quiz), 'eski')
+
+        import_question_blocks(quiz_type, [('7. 2 + 2 = ?', ['4', '*to\'rt', '5'])])
+        question.refresh_from_db()
+        self.assertEqual((question.correct_count, question.is_multiple_choice), (1, False))
+        # Davom etayotgan test keshdagi eski javoblar bilan qolmaydi (kalit versiyasi oshadi)
+        # va hisoblagichlari qayta hisoblanadi
+        quiz = GenerateQuiz.objects.select_related('quiz_type').get(id=quiz.id)
+        self.assertIsNone(cache.get(snapshot_key(quiz)))
+        self.assertIsNone(cache.get(answer_key_cache_key(quiz)))
+        self.assertEqual((quiz.answered_count, quiz.correct_count), (1, 0))
+
+    def test_reupload_with_moved_mark_keeps_old_rows(self):
+        from .importer import import_question_blocks
+
+        quiz_type = QuizType.objects.create(name='Fizika')
+        import_question_blocks(quiz_type, [('1. Savol', ['*A', 'B'])])
+        question = Question.objects.get(quiz_type=quiz_type)
+        old = set(question.answers.values_list('id', 'name', 'is_correct'))
+
+        stats, _ = import_question_blocks(quiz_type, [('1. Savol', ['A', '*B'])])
+        self.assertEqual(stats, {'inserted': 0, 'updated': 1, 'skipped': 0})
+        self.assertEqual(set(question.answers.filter(id__in=[a[0] for a in old]).values_list('id', 'name', 'is_correct')), old)
+        active = dict(question.answers.filter(is_active=True).values_list('name', 'is_correct'))
+        self.assertEqual(active, {'A': False, 'B': True})
+
+    def test_query_count_does_not_grow_with_file_size(self):
+        from .importer import import_question_blocks
+
+        def blocks(count, mark=0):
+            return [(f'{i + 1}. Savol {i}', [('*' if j == mark else '') + f'Javob {j}' for j in range(4)])
+                    for i in range(count)]
+
+        counts = []
+        # Ikkala hajm ham bitta batch ichida va SQLite'ning 999 parametr chegarasidan kichik
+        # (undan kattasini bulk_create o'zi bo'lib yuboradi — bu N+1 emas)
+        for size in (10, 60):
+            quiz_type = QuizType.objects.create(name=f'Hajm {size}')
+            runs = []
+            # Yangi fayl, o'zgarmagan qayta yuklash, to'g'ri javobi ko'chgan qayta yuklash
+            for mark in (0, 0, 1):
+                with CaptureQueriesContext(connection) as ctx:
+                    import_question_blocks(quiz_type, blocks(size, mark))
+                runs.append(len(ctx.captured_queries))
+            counts.append(runs)
+        self.assertEqual(counts[0], counts[1])
+
+
+class ImportJobTests(TransactionTestCase):
+    """
+    Fayl bazada bo'laklab saqlanadi; o'lgan worker qoldirgan 'running' vazifa qayta olinadi.
+    Batch'lar worker'dagidek tashqi tranzaksiyasiz commit qilinishi uchun TransactionTestCase.
+    """
+
+    def make_docx(self, *lines):
+        w = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+        body = ''.join(f'<w:p><w:r><w:t>{line}</w:t></w:r></w:p>' for line in lines)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('word/document.xml', f'<w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+        buffer.seek(0)
+        # Katta yuklamalar kabi (TemporaryUploadedFile) — chunks() haqiqatan bo'laklab o'qiydi
+        return File(buffer, name='savollar.docx')
+
+    def test_stale_running_job_is_reclaimed_and_finished(self):
+        from .jobs import JOB_TIMEOUT, MAX_ATTEMPTS, claim_next_job, run_import_job, save_upload
+        from .models import ImportJob, ImportJobChunk
+
+        quiz_type = QuizType.objects.create(name='Tarix')
+        long_ago = timezone.now() - JOB_TIMEOUT * 2
+        job = ImportJob.objects.create(quiz_type=quiz_type, status=ImportJob.STATUS_RUNNING,
+                                       started=long_ago, heartbeat=long_ago, attempts=1)
+        dead = ImportJob.objects.create(quiz_type=quiz_type, status=ImportJob.STATUS_RUNNING,
+                                        started=long_ago, attempts=MAX_ATTEMPTS)
+        for j in (job, dead):
+            # Kichik bo'laklar: fayl bir nechta qatordan qayta yig'iladi
+            save_upload(j, self.make_docx('1. Birinchi savol', '*To‘g‘ri', 'Noto‘g‘ri'), chunk_size=64)
+        self.assertGreater(job.chunks.count(), 1)
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.id, claimed.attempts), (job.id, 2))
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, ImportJob.STATUS_FAILED)
+        self.assertFalse(ImportJobChunk.objects.filter(job=dead).exists())
+
+        # Eski urinishning worker'i qaytib kelsa ham hech narsa yozmaydi
+        stale = ImportJob.objects.get(id=job.id)
+        stale.attempts = 1
+        with self.assertLogs('quiz.jobs', 'WARNING') as logs:
+            run_import_job(stale)
+        self.assertIn(f"Import #{job.id} boshqa worker'ga o'tdi", logs.output[0])
+        self.assertEqual(Question.objects.filter(quiz_type=quiz_type).count(), 0)
+
+        run_import_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count), (ImportJob.STATUS_DONE, 1))
+        self.assertFalse(ImportJobChunk.objects.filter(job=job).exists())
+        self.assertEqual(Question.objects.filter(quiz_type=quiz_type).count(), 1)
+
+    def test_status_is_visible_to_uploader_and_staff_only(self):
+        from .models import ImportJob
+
+        owner = User.objects.create_user('owner', password='x')
+        job = ImportJob.objects.create(quiz_type=QuizType.objects.create(name='Tarix'), created_by=owner,
+                                       problems=['1-blok: javob topilmadi'])
+        url = reverse('import_job_status', args=[job.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_user('other', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(owner)
+        self.assertEqual(self.client.get(url).json()['problems_count'], 1)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -14,9 +14,14 @@ urlpatterns = [
     path('questions/<int:pk>/delete/', views.QuestionDeleteView.as_view(), name='question_delete'),
     path('questions/<int:pk>/start/', views.generate_quiz, name='start_quiz'),
     path('upload-quiz/', views.upload_quiz_from_word, name='upload_quiz_from_word'),
+    path('upload-quiz/jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
+    path('metrics/', views.request_metrics, name='request_metrics'),
+    path('quiz/<int:quiz_id>/', views.quiz_app, name='quiz_app'),
+    path('quiz/<int:quiz_id>/payload/', views.quiz_payload, name='quiz_payload'),
     path('quiz/<int:quiz_id>/page/<int:page>/', views.quiz_page, name='quiz_page'),
-    path('quiz/save-answer/', views.save_answer, name='save_answer'),
-    path('quiz/finish/', views.finish_quiz, name='finish_quiz'),
+    path('quiz/<int:quiz_id>/save-answer/', views.save_answer, name='save_answer'),
+    path('quiz/<int:quiz_id>/save-answers/', views.save_answers, name='save_answers'),
+    path('quiz/<int:quiz_id>/finish/', views.finish_quiz, name='finish_quiz'),
     path('result_users/<str:test>/', views.result_users, name='result_users'),
 # Auth
     path('login/', views.user_login, name='login'),
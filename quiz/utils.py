@@ -0,0 +1,47 @@
+# quiz/utils.py
+import hashlib
+import heapq
+import re
+
+# Savol boshidagi tartib raqami ("12. ") — import qilingan savollarda bor
+_number_prefix = re.compile(r'^\s*\d+\.\s*')
+_spaces = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Taqqoslash uchun matnni normallashtiradi: \\xa0, ortiqcha bo'shliqlar, katta-kichik harf."""
+    return _spaces.sub(' ', text.replace('\xa0', ' ')).strip().casefold()
+
+
+def _question_key(question_text):
+    return normalize_text(_number_prefix.sub('', question_text, count=1))
+
+
+def question_content_hash(question_text, answer_texts):
+    """
+    Savolning mazmun xeshi: raqamsiz savol matni + saralangan javob matnlari.
+    Bir xil savol qayta yuklanganda (raqami boshqa bo'lsa ham) bir xil xesh chiqadi.
+    """
+    parts = [_question_key(question_text)]
+    parts.extend(sorted(normalize_text(a) for a in answer_texts))
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def question_text_hash(question_text):
+    """Faqat savol matnining (raqamsiz, normallashtirilgan) xeshi — javoblari o'zgargan savolni topish uchun."""
+    return hashlib.sha256(_question_key(question_text).encode('utf-8')).hexdigest()
+
+
+def seeded_order(seed, items, count=None, key=None):
+    """
+    Seed bo'yicha barqaror tartib: elementlar sha256(f"{seed}:{id}") bo'yicha saralanadi
+    (id — key(element) yoki elementning o'zi); count berilsa — birinchi count tasi.
+    random.sample/shuffle natijasi Python versiyalari orasida kafolatlanmaydi, bu esa o'zgarmaydi.
+    """
+    def rank(item):
+        ident = key(item) if key else item
+        return hashlib.sha256(f"{seed}:{ident}".encode('utf-8')).digest()
+
+    if count is None:
+        return sorted(items, key=rank)
+    return heapq.nsmallest(count, items, key=rank)
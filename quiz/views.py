@@ -1,22 +1,35 @@
 # quiz/views.py
 from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Prefetch, Case, When
 from .forms import QuizTypeForm, QuestionForm, AnswerFormSet, AnswerUpdateFormSet, UploadWordForm
 from django.views.generic import CreateView, UpdateView, DeleteView, ListView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from docx import Document
-import re
 import random, json
+from datetime import datetime, timezone as dt_timezone
+import zipfile
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.utils.safestring import mark_safe
 from django.db import transaction
 from django.utils import timezone
-from .models import QuizType, Question, Answer, GenerateQuiz, AnswerUsers, GenerateQuizQuestion
+from .answers import get_answer_key, get_quiz_state, lock_quiz, record_answers
+from .generation import claim_pregenerated, start_quiz
+from .jobs import save_upload
+from .middleware import metrics_summary
+from .pool import get_question_pool
+from .review import render_review, review_etag
+from .scoring import score_percent
+from .snapshot import build_quiz_snapshot, get_quiz_snapshot
+from .models import (
+    QuizType, Question, Answer, GenerateQuiz, AnswerUsers, GenerateQuizQuestion, ImportJob,
+    batch_correct_count,
+)
 
 
 
@@ -80,7 +93,9 @@ class QuizTypeUpdateView(SuperuserRequiredMixin, SuccessMessageMixin, UpdateView
         with transaction.atomic():
             self.object = form.save()
             formset.instance = self.object
-            formset.save()
+            # correct_count barcha javoblar saqlangach bitta UPDATE bilan yangilanadi
+            with batch_correct_count():
+                formset.save()
 
             quiz_type_id = form.cleaned_data['quiz_type'].id
             self.request.session['last_quiztype_id'] = quiz_type_id
@@ -152,7 +167,10 @@ class QuestionCreateView(SuperuserRequiredMixin, SuccessMessageMixin, CreateView
                 return self.form_invalid(form)
             self.object = form.save()
             formset.instance = self.object
-            formset.save()
+            # correct_count barcha javoblar saqlangach bitta UPDATE bilan yangilanadi
+            with batch_correct_count():
+                formset.save()
+            self.object.refresh_content_hash()
             # Oxirgi tanlangan quiz_type ni saqlash
             quiz_type_id = form.cleaned_data['quiz_type'].id
             self.request.session['last_quiztype_id'] = quiz_type_id
@@ -183,7 +201,10 @@ class QuestionUpdateView(SuperuserRequiredMixin, SuccessMessageMixin, UpdateView
         if formset.is_valid():
             self.object = form.save()
             formset.instance = self.object
-            formset.save()
+            # correct_count barcha javoblar saqlangach bitta UPDATE bilan yangilanadi
+            with batch_correct_count():
+                formset.save()
+            self.object.refresh_content_hash()
             # Yangi tanlangan quiz_type ni saqlash
             quiz_type_id = form.cleaned_data['quiz_type'].id
             self.request.session['last_quiztype_id'] = quiz_type_id
@@ -208,7 +229,9 @@ class QuestionDeleteView(SuperuserRequiredMixin, SuccessMessageMixin, DeleteView
 def upload_quiz_from_word(request):
     """
     Word fayldan savollarni import qiluvchi view.
-    - Hujjat ichidagi PARAGRAFLAR va TABLE CELL-larni ketma-ket o'qiydi.
+    Fayl bazaga bo'laklab yoziladi, ImportJob navbatga qo'yiladi va so'rov darhol qaytadi;
+    import `process_import_jobs` worker'ida bajariladi (quiz/jobs.py).
+    - Hujjat ichidagi PARAGRAFLAR va TABLE CELL-larni hujjatdagi tartibda, oqim bilan o'qiydi.
     - '1. ' kabi raqam+nuqta bilan boshlangan qatorlarni yangi savol deb oladi.
     - Raqamli qator va keyingi kelgan barcha qatorlar o'rtasidagi satrlar javob variantlari hisoblanadi.
     - Javob satri boshida '*' bo'lsa -> is_correct = True.
@@ -219,128 +242,21 @@ def upload_quiz_from_word(request):
             quiz_type = form.cleaned_data['quiz_type']
             file = request.FILES['file']
 
-            try:
-                doc = Document(file)
-            except Exception as e:
-                messages.error(request, f"❌ Word faylni o‘qib bo‘lmadi: {e}")
+            # .docx aslida zip arxiv: yaroqsiz faylni navbatga qo'ymaymiz
+            if not zipfile.is_zipfile(file):
+                messages.error(request, "❌ Word faylni o‘qib bo‘lmadi: fayl .docx formatida emas.")
                 return redirect("upload_quiz_from_word")
+            file.seek(0)
 
-            # --- 1) Hujjatdan barcha matn qatorlarini yig'ish ---
-            lines = []
-
-            # Paragraflar (agar oddiy matn ham bo'lsa)
-            for p in doc.paragraphs:
-                t = p.text.strip()
-                if t:
-                    # no-break space to'g'irlash
-                    lines.append(t.replace("\xa0", " "))
-
-            # Jadval ichidagi har bir cellni ham ketma-ket qo'shamiz
-            for table in doc.tables:
-                for row in table.rows:
-                    # Agar jadvalda bir nechta cell bo'lsa, ularni birlashtiramiz (odatiy holat: 1 cell/row)
-                    # Ammo bu yerda har bir cell alohida satr bo'lib keladi: shuning uchun hamma celllarni alohida qo'shamiz
-                    for cell in row.cells:
-                        cell_text = cell.text.strip()
-                        if cell_text:
-                            lines.append(cell_text.replace("\xa0", " "))
-
-            if not lines:
-                messages.error(request, "❌ Fayldan hech qanday matn o‘qilmadi.")
-                return redirect("upload_quiz_from_word")
-
-            # --- 2) Lines ni tahlil qilib savol-javob bloklariga ajratish ---
-            question_blocks = []  # har element: (q_line, [answer_lines...])
-            current_q = None
-            current_answers = []
-
-            # regex: boshida raqam + nuqta (masalan "1. " yoki "12. ")
-            q_pattern = re.compile(r'^\s*(\d+)\.\s*(.*)')
-
-            for line in lines:
-                # Tozalash
-                line = line.strip()
-                if not line:
-                    continue
-
-                m = q_pattern.match(line)
-                if m:
-                    # yangi savol topildi
-                    # avvalgi savolni saqlaymiz (agar mavjud)
-                    if current_q is not None:
-                        question_blocks.append((current_q, current_answers))
-                    # boshlagich: raqam va qolgan matn (savol matni)
-                    num = m.group(1)
-                    rest = m.group(2).strip()
-                    # Agar savol matn bo'sh bo'lsa, butun line ni savol sifatida olamiz
-                    if not rest:
-                        rest = line
-                    current_q = f"{num}. {rest}"
-                    current_answers = []
-                else:
-                    # Bu qatorda javob variantlari yoki savolga tegishli davomiy qatorlar bor
-                    # Agar qatorda bir nechta javoblar bo'lib ketgan bo'lsa (kam ehtimol), biz har bir qatorni alohida javob sifatida qabul qilamiz.
-                    current_answers.append(line)
-
-            # Oxirgi savolni ham qo'shamiz
-            if current_q is not None:
-                question_blocks.append((current_q, current_answers))
-
-            if not question_blocks:
-                messages.error(request, "❌ Faylda savollar topilmadi. Iltimos formatni tekshiring (1. Savol ...).")
-                return redirect("upload_quiz_from_word")
-
-            # --- 3) Har bir blokni DB ga yozish ---
-            created_q = 0
-            problems = []
-            for q_text, answers in question_blocks:
-                # Ba'zi bloklar savol bilan javobsiz kelishi mumkin -> e'tibor
-                if not answers:
-                    problems.append(f"'{q_text}' uchun javob topilmadi")
-                    continue
-
-                # Savolni saqlaymiz
-                question = Question.objects.create(
+            # Worker vazifani fayl to'liq yozilgandan keyin ko'radi
+            with transaction.atomic():
+                job = ImportJob.objects.create(
                     quiz_type=quiz_type,
-                    name=q_text,
+                    created_by=request.user if request.user.is_authenticated else None,
                 )
-
-                # Har bir javob qatorini Answer qilib yozamiz.
-                for ans_line in answers:
-                    # to'g'ri javob belgisi: boshida '*' bo'lsa yoki ans_line ichida '*'
-                    is_correct = False
-                    text = ans_line
-                    # ba'zan '*' belgisi qatorda boshlang‘ichda, ba'zan oxirida — oddiy holatda boshlanishi
-                    if text.startswith("*"):
-                        is_correct = True
-                        text = text[1:].strip()
-                    else:
-                        # agar '*' boshqa joyda bo'lsa (kam uchraydi), olib tashlab flag qo'yamiz
-                        if "*" in text:
-                            is_correct = True
-                            text = text.replace("*", "").strip()
-
-                    # Oxirgi tozalash
-                    text = text.strip()
-
-                    # Agar javob bo'sh bo'lsa — o'tkazamiz
-                    if not text:
-                        continue
-
-                    Answer.objects.create(
-                        question=question,
-                        name=text,
-                        is_correct=is_correct
-                    )
-
-                created_q += 1
-
-            # --- 4) Xabar berish ---
-            msg = f"✅ {created_q} ta savol '{quiz_type.name}' turiga muvaffaqiyatli yuklandi."
-            if problems:
-                msg += " Ba'zi bloklarda muammo: " + "; ".join(problems[:5])
-            messages.success(request, msg)
-            return redirect("upload_quiz_from_word")
+                save_upload(job, file)
+            messages.info(request, f"⏳ Fayl navbatga qo'yildi (import #{job.id}). Jarayonni shu sahifada kuzating.")
+            return redirect(f"{reverse('upload_quiz_from_word')}?job={job.id}")
 
         else:
             messages.error(request, "❌ Forma to'ldirishda xatolik bor.")
@@ -348,9 +264,45 @@ def upload_quiz_from_word(request):
     else:
         form = UploadWordForm()
 
-    return render(request, "quiz/upload_quiz.html", {"form": form})
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = ImportJob.objects.filter(id=job_id).first()
+        if job is not None and not job.visible_to(request.user):
+            job = None
+
+    return render(request, "quiz/upload_quiz.html", {"form": form, "job": job})
+
+
+# 🔹 IMPORT HOLATI (upload sahifasi polling qiladi)
+def import_job_status(request, job_id):
+    job = get_object_or_404(ImportJob, id=job_id)
+    if not job.visible_to(request.user):
+        raise Http404
+    return JsonResponse({
+        "id": job.id,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "processed": job.processed,
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "skipped": job.skipped_count,
+        "problems": job.problems[:5],
+        "problems_count": len(job.problems),
+        "error": job.error,
+        "finished": job.status in (ImportJob.STATUS_DONE, ImportJob.STATUS_FAILED),
+    })
+
 
 
+# 🔹 SO'ROVLAR O'LCHOVI (faqat superuser): sahifalar bo'yicha p50/p95/p99 va eng sekin SQL'lar
+def request_metrics(request):
+    if not request.user.is_superuser:
+        return JsonResponse({"success": False, "error": "Ruxsat yo'q"}, status=403)
+    return JsonResponse({
+        "sample_rate": getattr(settings, 'QUIZ_METRICS_SAMPLE_RATE', 0),
+        "views": metrics_summary(),
+    })
 
 
 # 🔹 TESTNI BOSHLASH
@@ -359,160 +311,238 @@ def generate_quiz(request, pk):
     n = int(request.GET.get("count", 10))
     quiz_type = get_object_or_404(QuizType, pk=pk)
 
-    # Faol savollar
-    question_ids = list(
-        Question.objects.filter(is_active=True, quiz_type_id=pk)
-        .values_list('id', flat=True)
-    )
+    # Faol savollar — jarayon ichidagi keshdan (Question jadvaliga murojaat yo'q)
+    question_ids = get_question_pool(quiz_type)
     if not question_ids:
         messages.error(request, f"❌ '{quiz_type.name}' uchun faol savollar yo‘q.")
         return redirect('quiztype_list')
 
     n = min(n, len(question_ids))
-    selected_q_ids = random.sample(question_ids, n)
 
-    with transaction.atomic():
-        quiz = GenerateQuiz.objects.create(
-            user=request.user,
-            quiz_type=quiz_type
-        )
-
-        # MUHIM: SESSIYAGA TO‘G‘RI MA'LUMOTLAR
-        request.session['quiz_id'] = quiz.id
-        request.session['selected_q_ids'] = selected_q_ids
-        request.session['quiz_start_time'] = timezone.now().isoformat()  # TIMER UCHUN
-        request.session.modified = True  # Django sessiyani saqlasin
-
-        # Savollarni GenerateQuizQuestion ga yozamiz
-        for qid in selected_q_ids:
-            GenerateQuizQuestion.objects.create(
-                quiz=quiz,
-                question_id=qid
-            )
-
-    # TO‘G‘RI yo‘nalish: quiz_id bilan
+    # Avval oldindan tayyorlangan testni olishga harakat qilamiz (bitta UPDATE)
+    quiz_id = claim_pregenerated(request.user, quiz_type, n)
+    if quiz_id is not None:
+        quiz = GenerateQuiz.objects.select_related('quiz_type').get(id=quiz_id)
+    else:
+        quiz = start_quiz(request.user, quiz_type, n)
+    # Savollar snapshoti va javob kaliti hozir quriladi — quiz_page va save_answer ularni keshdan oladi.
+    # Test holati sessiyada emas: tartib GenerateQuiz'da, boshlanish vaqti — GenerateQuiz.created
+    build_quiz_snapshot(quiz)
+    get_answer_key(quiz)
+
+    return _open_quiz(quiz)
+
+
+def _open_quiz(quiz):
+    # TO‘G‘RI yo‘nalish: quiz_id bilan (bitta sahifali rejim yoki har bir savol alohida sahifada)
+    if settings.QUIZ_SINGLE_PAGE:
+        return redirect('quiz_app', quiz_id=quiz.id)
     return redirect('quiz_page', quiz_id=quiz.id, page=1)
 
+
 # 🔹 SAVOLLARNI KO‘RISH (har biri alohida sahifada)
 def quiz_page(request, quiz_id, page):
-    quiz = get_object_or_404(GenerateQuiz, id=quiz_id, user=request.user)
-    selected_q_ids = request.session.get('selected_q_ids', [])
-
-    # Filter active questions, preserving session order
-    questions = Question.objects.filter(id__in=selected_q_ids, is_active=True).prefetch_related(
-        Prefetch('answers', queryset=Answer.objects.filter(is_active=True))
-    )
-
-    if selected_q_ids:
-        preserved_order = Case(*[When(id=pk, then=pos) for pos, pk in enumerate(selected_q_ids)])
-        questions = questions.order_by(preserved_order)
-
-    paginator = Paginator(questions, 1)
-    page_obj = paginator.get_page(page)
-    question = page_obj.object_list[0] if page_obj else None
-
-    # JAVOB BERILGAN SAHIFA RAQAMLARINI hisoblaymiz
-    answered_question_ids = AnswerUsers.objects.filter(
-        user=request.user,
-        generate_quiz=quiz
-    ).values_list('question_id', flat=True)
-
-    # Har bir savolning tartib raqamini (1,2,3...) topamiz
-    answered_pages = []
-    for idx, q in enumerate(questions, 1):
-        if q.id in answered_question_ids:
-            answered_pages.append(idx)
+    quiz = get_object_or_404(GenerateQuiz.objects.select_related('quiz_type'), id=quiz_id, user=request.user)
+    # Savollar va javoblar test snapshotidan (keshdan) — sahifa raqami bo'yicha to'g'ridan-to'g'ri
+    snapshot = get_quiz_snapshot(quiz)
+    questions = snapshot['questions']
+    total_pages = len(questions)
+    page = min(max(page, 1), total_pages) if total_pages else 1
+    question = questions[page - 1] if total_pages else None
+
+    # Foydalanuvchi javoblari: bitta so'rov — javob berilgan sahifalar va joriy savoldagi tanlov
+    answered_pages = set()
+    user_answers = []
+    for question_id, answer_id in AnswerUsers.objects.filter(
+        user=request.user, generate_quiz=quiz, selected=True
+    ).values_list('question_id', 'answer_id'):
+        if question_id in snapshot['pages']:
+            answered_pages.add(snapshot['pages'][question_id])
+        if question and question_id == question['id']:
+            user_answers.append(answer_id)
 
     context = {
         'quiz_type': quiz.quiz_type,
         'quiz': quiz,
         'question': question,
-        'paginator': paginator,
-        'page_obj': page_obj,
-        'answered_questions': answered_pages,  # SAHIFA RAQAMLARI (1,2,3...)
-        'total_minutes': len(selected_q_ids),
+        'answers': question['answers'] if question else [],
+        'user_answers': user_answers,
+        'page_number': page,
+        'total_pages': total_pages,
+        'page_range': range(1, total_pages + 1),
+        'answered_questions': sorted(answered_pages),  # SAHIFA RAQAMLARI (1,2,3...)
+        'total_minutes': snapshot['question_count'],
     }
     return render(request, 'quiz/quiz_page.html', context)
 
+# 🔹 BITTA SAHIFALI TEST: sahifa bir marta yuklanadi, savollar orasida brauzerda yuriladi
+def quiz_app(request, quiz_id):
+    quiz = get_object_or_404(GenerateQuiz.objects.select_related('quiz_type'), id=quiz_id, user=request.user)
+    return render(request, 'quiz/quiz_app.html', {'quiz': quiz, 'quiz_type': quiz.quiz_type})
+
+
+# 🔹 TESTNING TO'LIQ MA'LUMOTI (JSON): savollar, javoblar va foydalanuvchi tanlovlari
+def quiz_payload(request, quiz_id):
+    quiz = get_object_or_404(GenerateQuiz.objects.select_related('quiz_type'), id=quiz_id, user=request.user)
+    snapshot = get_quiz_snapshot(quiz)
+
+    selected = {}
+    for question_id, answer_id in AnswerUsers.objects.filter(
+        user=request.user, generate_quiz=quiz, selected=True
+    ).values_list('question_id', 'answer_id'):
+        selected.setdefault(question_id, []).append(answer_id)
+
+    return JsonResponse({
+        'quiz_id': quiz.id,
+        'numbers': quiz.numbers,
+        'questions': snapshot['questions'],  # to'g'ri javob belgilarisiz
+        'selected': selected,
+        'total_minutes': snapshot['question_count'],
+        'start_time': quiz.created.isoformat(),
+        'deadline': quiz.deadline.isoformat() if quiz.deadline else None,
+        'finished': quiz.finished is not None,
+    })
+
+
 # 🔹 AJAX ORQALI JAVOBNI SAQLASH
 # quiz/views.py
-def save_answer(request):
-    if request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            q_id = int(data.get('question_id'))
-            a_id = int(data.get('answer_id'))
-            quiz_id = request.session.get('quiz_id')
-
-            if not quiz_id:
-                return JsonResponse({"success": False, "error": "Sessiya yo'qolgan"}, status=400)
-
-            quiz = get_object_or_404(GenerateQuiz, id=quiz_id, user=request.user)
-            question = get_object_or_404(Question, id=q_id)
-            answer = get_object_or_404(Answer, id=a_id)
-
-            # Eski javobni o'chirish
-            AnswerUsers.objects.filter(
-                user=request.user,
-                generate_quiz=quiz,
-                question=question
-            ).delete()
-
-            # Yangi javob saqlash
-            AnswerUsers.objects.create(
-                user=request.user,
-                generate_quiz=quiz,
-                question=question,
-                answer=answer
-            )
-
-            # Javob berilgan savollar ro'yxatini yangilash
-            answered = AnswerUsers.objects.filter(
-                user=request.user,
-                generate_quiz=quiz
-            ).values_list('question_id', flat=True)
-
-            selected_q_ids = request.session.get('selected_q_ids', [])
-            answered = set(
-                AnswerUsers.objects.filter(user=request.user, generate_quiz=quiz).values_list('question_id', flat=True))
-            answered_pages = [idx for idx, qid in enumerate(selected_q_ids, 1) if qid in answered]
-            return JsonResponse({
-                "success": True,
-                "answered_questions": answered_pages
-            })
-
-        except Exception as e:
-            return JsonResponse({"success": False, "error": str(e)}, status=500)
-
-    return JsonResponse({"success": False}, status=400)
+def save_answer(request, quiz_id):
+    """
+    Javobni saqlaydi: bitta upsert (generate_quiz, question, choice) bo'yicha — qayta yuborilgan
+    yoki ikki marta bosilgan so'rov xato bermaydi. Savol testda, javob shu savolda ekani
+    keshdagi test snapshotidan tekshiriladi.
+    So'rovlar: test qatorini egasi bilan birga qulflash, mavjud yozuv, upsert, hisoblagichlar
+    UPDATE'i (snapshot va javob kaliti — bitta kesh get_many). Javobda faqat shu savolning sahifa raqami qaytadi,
+    brauzer javob berilgan sahifalar ro'yxatini o'zi yangilaydi.
+    Ko'p javobli savolda har bir variant alohida belgilanadi/olib tashlanadi ("selected": false).
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False}, status=400)
 
+    try:
+        data = json.loads(request.body)
+        q_id = int(data.get('question_id'))
+        a_id = int(data.get('answer_id'))
+        selected = bool(data.get('selected', True))
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "Noto'g'ri so'rov"}, status=400)
 
-# 🔹 TESTNI TUGATISH
-def finish_quiz(request):
-    quiz_id = request.session.get('quiz_id')
-    if not quiz_id:
-        return redirect('quiztype_list')
+    with transaction.atomic():
+        quiz = lock_quiz(request.user, quiz_id)
+        if quiz is None:
+            raise Http404
+        if not quiz.accepts_answers():
+            return JsonResponse({"success": False, "error": "Test vaqti tugagan"}, status=403)
+        snapshot, answer_key = get_quiz_state(quiz)
+        page = _answer_page(snapshot, q_id, a_id)
+        if page is None:
+            return JsonResponse({"success": False, "error": "Savol yoki javob bu testga tegishli emas"}, status=400)
+
+        choice = _answer_choice(snapshot, page, a_id)
+        record_answers(quiz, request.user, {(q_id, choice): (timezone.now(), a_id, selected)},
+                       answer_key=answer_key, locked=True)
+    return JsonResponse({"success": True, "answered_page": page})
+
+
+def _answer_page(snapshot, question_id, answer_id):
+    """Savol testda va javob shu savolniki bo'lsa — savolning sahifa raqami, aks holda None."""
+    page = snapshot['pages'].get(question_id)
+    if page is None or not any(a['id'] == answer_id for a in snapshot['questions'][page - 1]['answers']):
+        return None
+    return page
+
+
+def _answer_choice(snapshot, page, answer_id):
+    """AnswerUsers.choice: bitta javobli savolda 0, ko'p javobli savolda answer_id."""
+    return answer_id if snapshot['questions'][page - 1].get('multiple') else 0
 
-    quiz = get_object_or_404(GenerateQuiz, id=quiz_id, user=request.user)
-    selected_q_ids = request.session.get('selected_q_ids', [])
-    total_questions = len(selected_q_ids)
 
-    answers = AnswerUsers.objects.filter(user=request.user, generate_quiz=quiz)
-    correct = sum(1 for ans in answers if ans.answer.is_correct)
+# 🔹 JAVOBLARNI PAKET BILAN SAQLASH (brauzer o'zgarishlarni yig'ib, bir so'rovda yuboradi)
+MAX_ANSWER_BATCH = 500
+
+
+def save_answers(request, quiz_id):
+    """
+    {"answers": [{"question_id", "answer_id", "selected" (ixtiyoriy), "client_ts" (ms, ixtiyoriy)}, ...]}
+    — bitta tranzaksiyada. Har bir (savol, choice) uchun eng oxirgi (client_ts bo'yicha) o'zgarish
+    yutadi: paket ichida ham, bazadagi avvalgi javobga nisbatan ham. Kechikib kelgan eski paket
+    yangi javobni bosib ketmaydi. Testga tegishli bo'lmagan elementlar (masalan, snapshot qayta
+    qurilganda tushib qolgan savol) o'tkazib yuboriladi va "rejected" da qaytariladi — qolganlari saqlanadi.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False}, status=400)
+
+    now = timezone.now()
+    changes = []  # (question_id, answer_id, selected, answered_at)
+    rejected = []
+    try:
+        items = json.loads(request.body)['answers']
+        # Ro'yxat va uning elementlari obyekt bo'lishi shart — aks holda .get() 500 beradi
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise TypeError
+        if len(items) > MAX_ANSWER_BATCH:
+            return JsonResponse({"success": False, "error": "Paket juda katta"}, status=400)
+        for item in items:
+            answered_at = now
+            if item.get('client_ts') is not None:
+                # Brauzer soati oldinda bo'lsa ham server vaqtidan o'tkazmaymiz
+                answered_at = min(
+                    datetime.fromtimestamp(int(item['client_ts']) / 1000, tz=dt_timezone.utc), now
+                )
+            changes.append((int(item['question_id']), int(item['answer_id']),
+                            bool(item.get('selected', True)), answered_at))
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        return JsonResponse({"success": False, "error": "Noto'g'ri so'rov"}, status=400)
+
+    with transaction.atomic():
+        quiz = lock_quiz(request.user, quiz_id)
+        if quiz is None:
+            raise Http404
+        if not quiz.accepts_answers():
+            return JsonResponse({"success": False, "error": "Test vaqti tugagan"}, status=403)
+        snapshot, answer_key = get_quiz_state(quiz)
+        pages = set()
+        latest = {}  # (question_id, choice) -> (answered_at, answer_id, selected)
+        for q_id, a_id, selected, answered_at in changes:
+            page = _answer_page(snapshot, q_id, a_id)
+            if page is None:
+                rejected.append({"question_id": q_id, "answer_id": a_id})
+                continue
+            pages.add(page)
+            key = (q_id, _answer_choice(snapshot, page, a_id))
+            if key not in latest or answered_at >= latest[key][0]:
+                latest[key] = (answered_at, a_id, selected)
+
+        applied = record_answers(quiz, request.user, latest, answer_key=answer_key, locked=True) if latest else 0
+    return JsonResponse({
+        "success": True,
+        "answered_pages": sorted(pages),
+        "applied": applied,
+        "ignored": len(latest) - applied,
+        "rejected": rejected,
+    })
 
-    quiz.score = int((correct / total_questions) * 100) if total_questions > 0 else 0
-    quiz.finished = timezone.now()
-    quiz.save()
 
-    # Sessiyani tozalaymiz
-    for key in ['quiz_id', 'selected_q_ids', 'quiz_start_time']:
-        request.session.pop(key, None)
+# 🔹 TESTNI TUGATISH
+def finish_quiz(request, quiz_id):
+    quiz = get_object_or_404(GenerateQuiz.objects.select_related('quiz_type'), id=quiz_id, user=request.user)
+    # Natija jonli hisoblagichlardan — qo'shimcha hisob-kitobsiz bitta UPDATE
+    # (qayta ochilsa — avvalgi natija ko'rsatiladi)
+    if quiz.finished is None:
+        # Muddatdan keyin tugatilsa ham tugash vaqti — muddat (hisobotlar uchun).
+        # Shartli UPDATE: sweeper yoki boshqa so'rov allaqachon yopgan bo'lsa, o'sha natija qoladi
+        finished = min(timezone.now(), quiz.deadline) if quiz.deadline else timezone.now()
+        score = score_percent(quiz.correct_count, quiz.question_count)
+        if GenerateQuiz.objects.filter(id=quiz.id, finished__isnull=True).update(score=score, finished=finished):
+            quiz.score, quiz.finished = score, finished
+        else:
+            quiz.refresh_from_db(fields=['score', 'finished', 'answered_count', 'correct_count'])
 
     return render(request, 'quiz/quiz_result.html', {
         'quiz': quiz,
-        'total': total_questions,
-        'answered': answers.count(),
-        'correct': correct,
+        'total': quiz.question_count,
+        'answered': quiz.answered_count,
+        'correct': round(quiz.correct_count, 2),
         'percent': quiz.score,
     })
 
@@ -572,24 +602,32 @@ def user_signup(request):
 
     return render(request, 'quiz/signup.html')
 
-def result_users(request, test):
-    user = request.user
+def _etag_matches(request, etag):
+    """If-None-Match ro'yxatidagi teglardan biri aynan shu ETag (yoki '*'); W/ — kuchsiz taqqoslash."""
+    tags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
 
-    # Foydalanuvchi javoblarini savollar bilan birgalikda olish
-    my_tests = (
-        AnswerUsers.objects
-        .filter(user=user, generate_quiz=test)
-        .select_related('question', 'answer')
-        .order_by('-id')
-    )
 
-    # Yuqorida select_related ishlatilgani uchun bu joyda alohida so‘rov kerak emas
-    question_ids = my_tests.values_list('question_id', flat=True)
-    answer = Answer.objects.filter(question_id__in=question_ids)
-
-    context = {
-        'user': user,
-        'my_tests': my_tests,
-        'answer': answer,
-    }
-    return render(request, 'quiz/result_users.html', context)
\ No newline at end of file
+def result_users(request, test):
+    # Faqat o'z testini ko'rish mumkin
+    if not test.isdigit():
+        raise Http404
+    quiz = get_object_or_404(GenerateQuiz.objects.select_related('quiz_type'), id=int(test), user=request.user)
+
+    # Davom etayotgan testda to'g'ri javoblar ko'rsatilmaydi — test sahifasiga qaytaramiz
+    if quiz.accepts_answers():
+        return _open_quiz(quiz)
+
+    # Tugatilgan test o'zgarmaydi: ETag (score_version va deploy versiyasi bilan) aynan mos kelsa — 304
+    etag = review_etag(quiz) if quiz.finished else None
+    if etag and _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = render(request, 'quiz/result_users.html', {
+            'quiz': quiz,
+            'review_html': mark_safe(render_review(quiz)),
+        })
+    if etag:
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -13,19 +13,26 @@ import os
 from pathlib import Path
 
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
 
-SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "django-insecure-default")
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY")
 # SECRET_KEY = 'django-insecure-=)b08drq%ob1g8to$%1vr=vbzkdki@0lk(&)q(d53e@ss6n4o1'
 
 
 # DEBUG = os.environ.get("DEBUG", "True") == "True"
 DEBUG = True
 
+# Ochiq standart kalit bilan sessiya va CSRF imzolarini soxtalashtirish mumkin — production'da ishga tushmaymiz
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured("DJANGO_SECRET_KEY muhit o'zgaruvchisi o'rnatilmagan.")
+    SECRET_KEY = "django-insecure-default"
+
 
 ALLOWED_HOSTS = ['*','.railway.app', 'localhost', '127.0.0.1']
 
@@ -51,12 +58,16 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # So'rovlar o'lchovi — QUIZ_METRICS_SAMPLE_RATE > 0 bo'lsagina ulanadi
+    'quiz.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # So'rov profili — tasodifiy ulush yoki superuser sarlavhasi bilan
+    'quiz.middleware.RequestProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'quiz_app_project.urls'
@@ -137,4 +148,62 @@ LOGOUT_REDIRECT_URL = '/quiz/quiztype_list/'
 
 
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
\ No newline at end of file
+# Sessiyada faqat autentifikatsiya (test holati GenerateQuiz'da): o'qish keshdan, django_session
+# faqat kesh bo'sh bo'lganda va login/logout paytida. Sessiyalar serverda — bekor qilish mumkin
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Kesh (test snapshotlari, javob kalitlari, natija sahifalari):
+# - REDIS_URL bo'lsa — Redis: bir nechta worker/konteyner uchun tavsiya etiladi (umumiy kesh);
+# - aks holda — har bir jarayonning xotirasi (LocMem): bitta jarayonli o'rnatish, qo'shimcha SQL'siz;
+# - QUIZ_CACHE=db — faqat zaxira variant: har bir kesh o'qishi bazaga SQL so'rov bo'ladi.
+#   Jadval deploy paytida yaratiladi: `python manage.py createcachetable` (Procfile, release).
+# Kalitlar versiyalangan (quiz/snapshot.py), shuning uchun umumiy bo'lmagan kesh ham eskirmaydi.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ["REDIS_URL"],
+        }
+    }
+elif os.environ.get("QUIZ_CACHE") == "db":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'quiz_cache',
+            # Imtihon paytida har bir testning yozuvlari siqib chiqarilmasin
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+
+# Testlarni saqlash usuli: 'links' — har bir savol uchun GenerateQuizQuestion qatori,
+# 'seed' — faqat seed + savollar to'plami snapshoti (savollar talab qilinganda tiklanadi)
+QUIZ_STORAGE_MODE = os.environ.get("QUIZ_STORAGE_MODE", "links")
+# Seed rejimida javoblar tartibini ham aralashtirish
+QUIZ_SHUFFLE_ANSWERS = os.environ.get("QUIZ_SHUFFLE_ANSWERS", "False") == "True"
+# Test bitta sahifada ochiladi (savollar bir marta JSON bilan yuklanadi);
+# False — har bir savol alohida sahifada (quiz_page)
+QUIZ_SINGLE_PAGE = os.environ.get("QUIZ_SINGLE_PAGE", "True") == "True"
+# Ko'p javobli savollarni baholash: 'all_or_nothing' yoki 'partial' (quiz/scoring.py)
+QUIZ_SCORING_POLICY = os.environ.get("QUIZ_SCORING_POLICY", "all_or_nothing")
+# So'rovlar o'lchovi (quiz/middleware.py): o'lchanadigan so'rovlar ulushi, 0 — o'chirilgan
+QUIZ_METRICS_SAMPLE_RATE = float(os.environ.get("QUIZ_METRICS_SAMPLE_RATE", "0"))
+# Har bir sahifa uchun xotirada saqlanadigan oxirgi o'lchovlar soni (p50/p95/p99 shulardan)
+QUIZ_METRICS_WINDOW = int(os.environ.get("QUIZ_METRICS_WINDOW", "500"))
+# So'rov profili (quiz/middleware.py): tasodifiy profillanadigan so'rovlar ulushi, 0 — faqat sarlavha bilan
+QUIZ_PROFILE_SAMPLE_RATE = float(os.environ.get("QUIZ_PROFILE_SAMPLE_RATE", "0"))
+# Superuser shu sarlavha bilan so'rovni profillaydi; bo'sh satr — o'chirilgan
+QUIZ_PROFILE_HEADER = os.environ.get("QUIZ_PROFILE_HEADER", "X-Profile")
+# Stek o'qish oralig'i (soniya) va saqlanadigan oxirgi profillar soni
+QUIZ_PROFILE_INTERVAL = float(os.environ.get("QUIZ_PROFILE_INTERVAL", "0.005"))
+QUIZ_PROFILE_KEEP = int(os.environ.get("QUIZ_PROFILE_KEEP", "50"))
+# Deploy versiyasi (masalan, git commit): natija sahifasi ETag'i va keshi kalitiga qo'shiladi —
+# yangi shablon yoki kod chiqqanda brauzer va keshdagi eski nusxalar ishlatilmay qoladi
+QUIZ_RELEASE = os.environ.get("QUIZ_RELEASE", "")